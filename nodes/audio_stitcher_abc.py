@@ -12,6 +12,38 @@ from torchaudio.transforms import Resample
 import comfy.utils
 
 
+def _normalize_envelope_eager(wav: torch.Tensor, target_amp: float) -> Tuple[torch.Tensor, torch.Tensor]:
+    # 一次 abs 同时得到归一化峰值与裁剪静音所需的逐帧包络，缩放在同一表达式内完成
+    mono = wav.abs().amax(dim=0)
+    peak = mono.amax()
+    scale = torch.where(peak > 0, target_amp / peak, torch.ones_like(peak))
+    return wav * scale, mono * scale
+
+
+def _compile_or_eager(fn):
+    # PyTorch 2.x 下用 torch.compile 融合逐元素运算；不可用或编译/运行失败时永久回退到 eager
+    compile_fn = getattr(torch, "compile", None)
+    if compile_fn is None:
+        return fn
+    try:
+        compiled = compile_fn(fn, dynamic=True)
+    except Exception:  # noqa: BLE001
+        return fn
+    state = {"fn": compiled}
+
+    def runner(*args):
+        try:
+            return state["fn"](*args)
+        except Exception:  # noqa: BLE001
+            state["fn"] = fn
+            return fn(*args)
+
+    return runner
+
+
+_normalize_envelope = _compile_or_eager(_normalize_envelope_eager)
+
+
 class AudioStitcherABC:
     @classmethod
     def INPUT_TYPES(cls):
@@ -96,10 +128,11 @@ class AudioStitcherABC:
         return file_list
 
     @staticmethod
-    def _trim_silence_if_needed(wav: Optional[torch.Tensor], sr: int, enable: bool) -> Optional[torch.Tensor]:
+    def _trim_silence_if_needed(wav: Optional[torch.Tensor], sr: int, enable: bool, mono: Optional[torch.Tensor] = None) -> Optional[torch.Tensor]:
         if wav is None or not enable:
             return wav
-        mono = wav.abs().max(dim=0).values
+        if mono is None:
+            mono = wav.abs().max(dim=0).values
         threshold = 10 ** (-45.0 / 20)
         mask = (mono > threshold).nonzero(as_tuple=False).flatten()
         if mask.numel() == 0:
@@ -113,6 +146,11 @@ class AudioStitcherABC:
             return wav
         return wav[:, start:end]
 
+    @staticmethod
+    def _normalize_and_trim(wav: torch.Tensor, target_db: float, sr: int, trim_silence: bool) -> torch.Tensor:
+        wav, mono = _normalize_envelope(wav, 10 ** (target_db / 20))
+        return AudioStitcherABC._trim_silence_if_needed(wav, sr, trim_silence, mono)
+
     @staticmethod
     def _decode_with_ffmpeg(path: str, target_sr: int) -> Tuple[Optional[torch.Tensor], Optional[str]]:
         ffmpeg_bin = shutil.which("ffmpeg")
@@ -175,11 +213,7 @@ class AudioStitcherABC:
                 wav = wav.repeat(2, 1)
             elif wav.shape[0] > 2:
                 wav = wav[:2, :]
-            max_val = torch.max(torch.abs(wav)).item()
-            if max_val > 0:
-                target_amp = 10 ** (target_db / 20)
-                wav = wav * (target_amp / max_val)
-            wav = AudioStitcherABC._trim_silence_if_needed(wav, target_sr, trim_silence)
+            wav = AudioStitcherABC._normalize_and_trim(wav, target_db, target_sr, trim_silence)
             return wav, None
         except Exception as exc:  # noqa: BLE001
             if not ffmpeg_fallback:
@@ -187,32 +221,35 @@ class AudioStitcherABC:
             ffmpeg_wav, ffmpeg_err = AudioStitcherABC._decode_with_ffmpeg(path, target_sr)
             if ffmpeg_wav is None:
                 return None, ffmpeg_err
-            max_val = torch.max(torch.abs(ffmpeg_wav)).item()
-            if max_val > 0:
-                target_amp = 10 ** (target_db / 20)
-                ffmpeg_wav = ffmpeg_wav * (target_amp / max_val)
-            ffmpeg_wav = AudioStitcherABC._trim_silence_if_needed(ffmpeg_wav, target_sr, trim_silence)
+            ffmpeg_wav = AudioStitcherABC._normalize_and_trim(ffmpeg_wav, target_db, target_sr, trim_silence)
             return ffmpeg_wav, None
 
     @staticmethod
-    def _stitch_two(w1: Optional[torch.Tensor], w2: Optional[torch.Tensor], offset: float, sr: int) -> Optional[torch.Tensor]:
-        if w1 is None:
-            return w2
-        if w2 is None:
-            return w1
-        offset_frames = int(abs(offset) * sr)
-        len1, len2 = w1.shape[1], w2.shape[1]
-        if offset < 0:  # overlap mix
-            overlap = min(offset_frames, min(len1, len2))
-            total = max(len1, len2 + len1 - overlap)
-            out = torch.zeros((2, total), device=w1.device, dtype=w1.dtype)
-            out[:, :len1] = w1
-            start2 = max(0, len1 - overlap)
-            valid2 = min(len2, total - start2)
-            out[:, start2:start2 + valid2] += w2[:, :valid2]
-            return out
-        gap = torch.zeros((2, offset_frames), device=w1.device, dtype=w1.dtype)
-        return torch.cat((w1, gap, w2), dim=1)
+    def _stitch_clips(parts: Sequence[Tuple[torch.Tensor, float]], sr: int) -> Optional[torch.Tensor]:
+        # offset 为与前一段的连接偏移：负数重叠混音，正数插入静音；先算好各段位置，只分配一次输出
+        if not parts:
+            return None
+        first = parts[0][0]
+        if len(parts) == 1:
+            return first
+
+        starts: List[int] = [0]
+        total = first.shape[1]
+        for wav, offset in parts[1:]:
+            offset_frames = int(abs(offset) * sr)
+            length = wav.shape[1]
+            if offset < 0:  # overlap mix
+                overlap = min(offset_frames, min(total, length))
+                start = total - overlap
+            else:
+                start = total + offset_frames
+            starts.append(start)
+            total = max(total, start + length)
+
+        out = torch.zeros((2, total), device=first.device, dtype=first.dtype)
+        for (wav, _), start in zip(parts, starts):
+            out[:, start:start + wav.shape[1]] += wav
+        return out
 
     def stitch(
         self,
@@ -304,8 +341,12 @@ class AudioStitcherABC:
                 if pC and wav_C is None:
                     raise RuntimeError(f"C 片段加载失败: {pC} ({err_C})")
 
-                current = self._stitch_two(wav_A, wav_B, offset_A_B, target_sr)
-                final = self._stitch_two(current, wav_C, offset_B_C, target_sr)
+                parts = [
+                    (wav, offset)
+                    for wav, offset in ((wav_A, 0.0), (wav_B, offset_A_B), (wav_C, offset_B_C))
+                    if wav is not None
+                ]
+                final = self._stitch_clips(parts, target_sr)
 
                 if final is None:
                     raise RuntimeError("拼接结果为空")
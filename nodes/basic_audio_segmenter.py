@@ -63,27 +63,22 @@ class buding_BasicAudioSegmenter:
                 # 如果没有脚本，生成默认文本
                 script_lines = [f"音频片段 {i+1}" for i in range(int(total_duration / segment_duration))]
             
-            # 计算分段
+            # 计算分段（起止时间整列计算，文本按下标轮询分配）
             num_segments = math.ceil(total_duration / segment_duration)
-            segments = []
-            
-            for i in range(num_segments):
-                start_time = i * segment_duration
-                end_time = min((i + 1) * segment_duration, total_duration)
-                
-                # 分配文本（轮询或重复）
-                if i < len(script_lines):
-                    text = script_lines[i]
-                else:
-                    text = script_lines[i % len(script_lines)] if script_lines else f"片段 {i+1}"
-                
-                segments.append({
+            starts = [i * segment_duration for i in range(num_segments)]
+            ends = [min((i + 1) * segment_duration, total_duration) for i in range(num_segments)]
+            line_count = len(script_lines)
+
+            segments = [
+                {
                     "segment_id": i + 1,
                     "start": round(start_time, 2),
                     "end": round(end_time, 2),
                     "duration": round(end_time - start_time, 2),
-                    "text": text
-                })
+                    "text": script_lines[i % line_count] if line_count else f"片段 {i+1}"
+                }
+                for i, (start_time, end_time) in enumerate(zip(starts, ends))
+            ]
             
             # 生成切分信息
             result = {
@@ -14,10 +14,16 @@ buding_BatchImageLoader - 智能图像批量加载器
 import os
 import re
 import json
-import random
+import multiprocessing
+import difflib
+import struct
+import threading
 import time
-from pathlib import Path
-from typing import List, Dict, Any, Tuple, Union
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, Tuple, Union, Callable
 import numpy as np
 import torch
 
@@ -37,6 +43,13 @@ except ImportError:
     PILLOW_AVAILABLE = False
     print("❌ Pillow未找到，无法加载图像")
 
+# pyvips为可选后端：按需流式解码，大图峰值内存更低
+try:
+    import pyvips
+    PYVIPS_AVAILABLE = True
+except (ImportError, OSError):
+    PYVIPS_AVAILABLE = False
+
 # ComfyUI相关导入
 try:
     from comfy.utils import ProgressBar
@@ -58,6 +71,13 @@ except ImportError:
             if desc:
                 print(f"{desc}: {value}/{self.total}")
 
+# orjson为可选依赖，解析映射JSON更快
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # 自然排序支持
 try:
     from natsort import natsorted
@@ -67,6 +87,230 @@ except ImportError:
     print("⚠️ 建议安装 natsort 以获得更好的自然排序: pip install natsort")
 
 
+# 文件头尺寸解析（只读取少量字节，不构造解码器）
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+_PNG_COLOR_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+# SOF0-SOF15，排除 DHT(C4)、JPG(C8)、DAC(CC)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# RST0-RST7、SOI(D8) 与 TEM(01) 无段长度；EOI(D9) 不在其中，遇到时结束扫描
+_JPEG_STANDALONE_MARKERS = frozenset(range(0xD0, 0xD9)) | {0x01}
+
+# 文件名清理用的预编译正则
+_RE_SEP = re.compile(r'[_\-\s]+')
+_RE_VER = re.compile(r'[ _]?[vV][0-9]+')
+_RE_NUM = re.compile(r'\b\d+\b')
+_RE_KEEP = re.compile(r'[^\w\u4e00-\u9fff\s\-_\.\(\)\[\]]')
+
+# uint8 -> [0, 1] float32 查找表（与 x / 255.0 结果逐值一致）
+_U8_TO_F01_LUT = np.arange(256, dtype=np.float32) / np.float32(255.0)
+
+# 无可用图像时返回的占位张量（只读使用，避免每次重新分配）
+_EMPTY_IMAGE_TENSOR = torch.zeros(1, 64, 64, 3)
+
+# 预定义宽高比
+_ASPECT_RATIOS = {
+    "1:1": 1.0,
+    "16:9": 16.0 / 9.0,
+    "4:3": 4.0 / 3.0,
+    "3:2": 3.0 / 2.0,
+}
+
+
+def _read_jpeg_dims(f) -> Union[Tuple[int, int, int, str], None]:
+    """从SOI之后逐个跳过段，读取SOFn中的尺寸"""
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b'\xff':
+            continue
+        marker = f.read(1)
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code in _JPEG_STANDALONE_MARKERS:
+            continue
+        if code == 0xD9 or code == 0xDA:
+            return None
+        seg_len = f.read(2)
+        if len(seg_len) < 2:
+            return None
+        length = struct.unpack('>H', seg_len)[0]
+        if code in _JPEG_SOF_MARKERS:
+            data = f.read(6)
+            if len(data) < 6:
+                return None
+            height, width, components = struct.unpack('>HHB', data[1:6])
+            return width, height, components, 'JPEG'
+        f.seek(length - 2, 1)
+
+
+def _read_dims_from_header(file_path: str) -> Union[Tuple[int, int, int, str], None]:
+    """解析PNG/JPEG/WebP/BMP文件头，返回 (width, height, channels, format)；无法识别时返回None"""
+    with open(file_path, 'rb') as f:
+        head = f.read(32)
+        if head[:8] == _PNG_SIGNATURE and head[12:16] == b'IHDR':
+            width, height = struct.unpack('>II', head[16:24])
+            return width, height, _PNG_COLOR_CHANNELS.get(head[25], 3), 'PNG'
+        if head[:2] == b'\xff\xd8':
+            return _read_jpeg_dims(f)
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP' and len(head) >= 30:
+            chunk = head[12:16]
+            if chunk == b'VP8X':
+                width = int.from_bytes(head[24:27], 'little') + 1
+                height = int.from_bytes(head[27:30], 'little') + 1
+                return width, height, 4 if head[20] & 0x10 else 3, 'WEBP'
+            if chunk == b'VP8L' and head[20] == 0x2F:
+                bits = int.from_bytes(head[21:25], 'little')
+                width = (bits & 0x3FFF) + 1
+                height = ((bits >> 14) & 0x3FFF) + 1
+                return width, height, 4 if (bits >> 28) & 1 else 3, 'WEBP'
+            if chunk == b'VP8 ' and head[23:26] == b'\x9d\x01\x2a':
+                width = int.from_bytes(head[26:28], 'little') & 0x3FFF
+                height = int.from_bytes(head[28:30], 'little') & 0x3FFF
+                return width, height, 3, 'WEBP'
+            return None
+        if head[:2] == b'BM' and len(head) >= 30:
+            width, height = struct.unpack('<ii', head[18:26])
+            bits_per_pixel = struct.unpack('<H', head[28:30])[0]
+            return width, abs(height), 4 if bits_per_pixel == 32 else 3, 'BMP'
+    return None
+
+
+# PNG中参与元数据关键词筛选的文本块关键字
+_METADATA_KEYS = frozenset(['parameters', 'prompt', 'negative_prompt', 'description'])
+_PNG_TEXT_CHUNKS = frozenset([b'tEXt', b'zTXt', b'iTXt'])
+
+
+def _read_png_text_chunks(file_path: str, keys: frozenset) -> List[str]:
+    """逐块遍历PNG，只解码关键字命中的tEXt/zTXt/iTXt块（与Pillow一致，读到IDAT为止）"""
+    texts = []
+    with open(file_path, 'rb') as f:
+        if f.read(8) != _PNG_SIGNATURE:
+            return texts
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                break
+            length, chunk_type = struct.unpack('>I4s', chunk_header)
+            if chunk_type in (b'IDAT', b'IEND'):
+                break
+            if chunk_type not in _PNG_TEXT_CHUNKS:
+                f.seek(length + 4, 1)
+                continue
+            
+            # 关键字最长79字节，先只读开头判断是否需要
+            head = f.read(min(length, 80))
+            keyword, sep, rest = head.partition(b'\0')
+            if not sep or keyword.decode('latin-1').lower() not in keys:
+                f.seek(length - len(head) + 4, 1)
+                continue
+            data = rest + f.read(length - len(head))
+            f.seek(4, 1)
+            
+            try:
+                if chunk_type == b'tEXt':
+                    texts.append(data.decode('latin-1'))
+                elif chunk_type == b'zTXt':
+                    texts.append(zlib.decompress(data[1:]).decode('latin-1'))
+                else:
+                    compressed = data[0]
+                    _, _, data = data[2:].partition(b'\0')  # 语言标签
+                    _, _, data = data.partition(b'\0')      # 翻译后的关键字
+                    if compressed:
+                        data = zlib.decompress(data)
+                    texts.append(data.decode('utf-8'))
+            except (zlib.error, UnicodeDecodeError):
+                continue
+    return texts
+
+
+# 待读取文件头的文件超过该数量时才启用多进程，避免进程启动和序列化开销大于收益
+_PARALLEL_SCAN_MIN_FILES = 5000
+
+# 多进程扫描只使用fork：本节点包以带连字符的模块名加载，不在sys.path上，
+# spawn/forkserver启动的子进程无法导入_scan_shard，只会白白付出进程启动开销后回退
+try:
+    _FORK_CONTEXT = multiprocessing.get_context('fork')
+except ValueError:
+    _FORK_CONTEXT = None
+
+
+def _scan_shard(shard: Tuple[List[str], str, bool]) -> List[Dict[str, Any]]:
+    """多进程扫描的工作函数：读取一组文件的图像头信息，按输入顺序返回"""
+    paths, backend, need_metadata = shard
+    loader = buding_BatchImageLoader()
+    return [loader._extract_image_metadata_fast(path, backend, False, need_metadata) for path in paths]
+
+
+def _jpeg_reduce_factor(file_info: Dict, max_decode_size: int) -> int:
+    """JPEG缩小解码倍数（1/2/4/8）：取最长边仍不小于max_decode_size的最大倍数；非JPEG或未启用时为1"""
+    if max_decode_size <= 0 or not file_info['path'].lower().endswith(('.jpg', '.jpeg')):
+        return 1
+    longest = max(file_info.get('width', 0), file_info.get('height', 0))
+    for factor in (8, 4, 2):
+        if longest >= max_decode_size * factor:
+            return factor
+    return 1
+
+
+def _decode_rgb_opencv(file_path: str, reduce_factor: int = 1) -> np.ndarray:
+    """OpenCV解码为uint8 RGB数组；reduce_factor>1时JPEG解码器直接输出缩小后的图像"""
+    flags = {
+        1: cv2.IMREAD_COLOR,
+        2: cv2.IMREAD_REDUCED_COLOR_2,
+        4: cv2.IMREAD_REDUCED_COLOR_4,
+        8: cv2.IMREAD_REDUCED_COLOR_8,
+    }[reduce_factor]
+    img = cv2.imread(file_path, flags)
+    if img is None:
+        raise ValueError("OpenCV无法读取图像文件")
+    
+    # BGR转RGB
+    return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+
+def _decode_rgb_pillow(file_path: str) -> np.ndarray:
+    """Pillow解码为uint8 RGB数组（np.asarray复用PIL导出的缓冲区，不再额外复制）"""
+    with Image.open(file_path) as img:
+        # 转换为RGB
+        return np.asarray(img.convert("RGB"))
+
+
+def _decode_rgb_pyvips(file_path: str) -> np.ndarray:
+    """pyvips顺序读取模式解码为uint8 RGB数组（逐块流式解码）"""
+    img = pyvips.Image.new_from_file(file_path, access='sequential')
+    
+    # 与Pillow的convert("RGB")一致：丢弃alpha，灰度/16位等统一转为8位sRGB三通道
+    if img.hasalpha():
+        img = img.extract_band(0, n=img.bands - 1)
+    if img.interpretation != 'srgb' or img.format != 'uchar' or img.bands != 3:
+        img = img.colourspace('srgb')
+    if img.format != 'uchar':
+        img = img.cast('uchar')
+    
+    return np.ndarray(buffer=img.write_to_memory(), dtype=np.uint8,
+                      shape=(img.height, img.width, img.bands))
+
+
+@lru_cache(maxsize=8)
+def _parse_mapping_json(mapping_json: str) -> Any:
+    """按原始字符串缓存映射JSON的解析结果（映射表很少变化；返回值只读使用）"""
+    return orjson.loads(mapping_json) if ORJSON_AVAILABLE else json.loads(mapping_json)
+
+
+def _build_mapping_replacer(mapping_dict: Dict) -> Callable[[str], str]:
+    """把映射表编译为单个正则（长词优先），一次扫描完成所有规则的替换"""
+    rules = {str(old): str(new) for old, new in mapping_dict.items() if str(old)}
+    if not rules:
+        return lambda text: text
+    pattern = re.compile('|'.join(re.escape(old) for old in sorted(rules, key=len, reverse=True)))
+    return lambda text: pattern.sub(lambda m: rules[m.group(0)], text)
+
+
 class buding_BatchImageLoader:
     """
     智能图像批量加载器
@@ -78,8 +322,23 @@ class buding_BatchImageLoader:
     - 智能映射和错误恢复
     """
     
-    # 静态缓存，用于存储已扫描的路径和元数据
-    cache: Dict[str, Any] = {}
+    # 静态缓存，用于存储已扫描的路径和元数据（LRU，有容量上限）
+    # cache: 文件签名+筛选参数 -> 筛选结果；_header_cache: (路径, 大小, 修改时间, ...) -> 图像头信息
+    cache: "OrderedDict[Tuple, Tuple[List[Dict], List[str]]]" = OrderedDict()
+    _header_cache: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+    CACHE_MAX_ENTRIES = 16
+    HEADER_CACHE_MAX_ENTRIES = 100000
+    
+    # _decode_cache: (路径, 修改时间, 大小, 后端) -> 解码后的只读uint8 RGB数组；按条数和总字节数双重限制
+    # 解码在线程池中进行，读写时加锁
+    _decode_cache: "OrderedDict[Tuple, np.ndarray]" = OrderedDict()
+    _decode_cache_lock = threading.Lock()
+    DECODE_CACHE_MAX_ENTRIES = 16
+    DECODE_CACHE_MAX_BYTES = 512 * 1024 * 1024
+    
+    # 解码线程池在所有调用间共享，首次使用时创建，避免每次加载都新建和销毁线程
+    _executor: Union[ThreadPoolExecutor, None] = None
+    _executor_lock = threading.Lock()
     
     @classmethod
     def INPUT_TYPES(cls):
@@ -103,7 +362,7 @@ class buding_BatchImageLoader:
                 # 性能与鲁棒性
                 "fast_scan_mode": ("BOOLEAN", {"default": True, "tooltip": "两遍扫描：先元数据筛选，再加载像素"}),
                 "scan_max_depth": ("INT", {"default": 10, "min": 1, "max": 100, "step": 1, "tooltip": "目录扫描最大深度，1表示只扫描当前目录"}),
-                "image_backend": (["OpenCV", "Pillow"], {"default": "OpenCV" if OPENCV_AVAILABLE else "Pillow", "tooltip": "图像加载后端"}),
+                "image_backend": (["OpenCV", "Pillow"] + (["pyvips"] if PYVIPS_AVAILABLE else []), {"default": "OpenCV" if OPENCV_AVAILABLE else "Pillow", "tooltip": "图像加载后端"}),
                 "on_io_error": (["停止并报错", "跳过并警告"], {"default": "停止并报错", "tooltip": "文件缺失等IO错误处理"}),
                 "on_data_error": (["跳过并警告", "停止并报错"], {"default": "跳过并警告", "tooltip": "文件损坏等数据错误处理"}),
                 "max_filesize_kb": ("INT", {"default": 50000, "min": 0, "max": 10485760, "step": 1024, "tooltip": "最大文件大小限制(KB)，最大10485760KB(10GB)"}),
@@ -124,6 +383,8 @@ class buding_BatchImageLoader:
                 "file_limit": ("INT", {"default": 0, "min": 0, "step": 1, "tooltip": "输出列表最大文件数量，0表示不限制"}),
                 "start_index": ("INT", {"default": 0, "min": 0, "step": 1, "tooltip": "从列表的哪个索引开始输出"}),
                 "select_index": ("INT", {"default": -1, "min": -1, "step": 1, "tooltip": "强制选中列表中的特定索引文件，-1禁用"}),
+                "parallel_scan_workers": ("INT", {"default": 0, "min": 0, "max": 64, "step": 1, "tooltip": "读取文件头的进程数，0表示不启用；仅在待扫描文件超过5000个、且系统支持fork启动子进程时生效（Windows下无效）"}),
+                "max_decode_size": ("INT", {"default": 0, "min": 0, "max": 32768, "step": 64, "tooltip": "OpenCV后端JPEG解码的目标最长边，0表示原尺寸；大于0时按1/2、1/4、1/8缩小解码，最长边不小于该值"}),
             }
         }
         return inputs
@@ -137,8 +398,12 @@ class buding_BatchImageLoader:
     @classmethod
     def IS_CHANGED(cls, directory_path, image_extension, keywords, similarity_threshold, debug_mode=False, **kwargs):
         """检查输入是否改变"""
-        param_string = f"{directory_path}_{image_extension}_{keywords}_{similarity_threshold}_{str(kwargs)}"
-        return hash(param_string)
+        # 直接对参数元组求哈希，不拼接中间字符串；非基本类型的值用repr保证可哈希
+        extra = tuple(sorted(
+            (key, value if isinstance(value, (int, float, str, bool)) else repr(value))
+            for key, value in kwargs.items()
+        ))
+        return hash((directory_path, image_extension, keywords, similarity_threshold, extra))
 
     def load_batch(self, directory_path: str, keywords: str, image_extension: str = ".png|.jpg|.jpeg", 
                    similarity_threshold: float = 0.7, debug_mode: bool = False, 
@@ -150,7 +415,8 @@ class buding_BatchImageLoader:
                    enable_time_filter: bool = False, min_age_days: str = "0.0", max_age_days: str = "0.0", 
                    date_filter_mode: str = "修改时间", sort_mode: str = "文件名(数字优先)", 
                    random_selection: bool = False, seed: int = 0, file_limit: int = 0, 
-                   start_index: int = 0, select_index: int = -1, **kwargs: Any) -> Tuple[torch.Tensor, str, int, int]:
+                   start_index: int = 0, select_index: int = -1, parallel_scan_workers: int = 0,
+                   max_decode_size: int = 0, **kwargs: Any) -> Tuple[torch.Tensor, str, int, int]:
         """智能图像批量加载主函数"""
         
         # 参数验证：处理字符串转换为float
@@ -173,12 +439,20 @@ class buding_BatchImageLoader:
                 print("⚠️ OpenCV不可用，自动切换到Pillow后端")
             image_backend = "Pillow"
         
+        if image_backend == "pyvips" and not PYVIPS_AVAILABLE:
+            if debug_mode:
+                print("⚠️ pyvips不可用，自动切换到Pillow后端")
+            image_backend = "Pillow"
+        
         # 初始化进度条和错误日志
         pbar = ComfyUIProgressBar(100)
         pbar.update(5, desc="初始化图像加载器...")
         error_log = []
         
         try:
+            # 指定索引且顺序确定时，第一遍扫描只需找到该索引对应的文件
+            stop_after = select_index if select_index >= 0 and not random_selection and sort_mode != "随机排序" else -1
+            
             # 1. 两遍扫描机制：第一遍扫描元数据
             all_file_infos = self._scan_and_filter_metadata(
                 directory_path, image_extension, keywords, similarity_threshold, 
@@ -186,7 +460,8 @@ class buding_BatchImageLoader:
                 fast_scan_mode, scan_max_depth, image_backend, on_io_error, on_data_error,
                 max_filesize_kb, min_filesize_kb, enable_mapping, mapping_json,
                 enable_negative_filter, negative_keywords, enable_time_filter,
-                min_age_days, max_age_days, date_filter_mode, debug_mode, error_log
+                min_age_days, max_age_days, date_filter_mode, parallel_scan_workers, debug_mode, error_log,
+                sort_mode=sort_mode, stop_after=stop_after
             )
             pbar.update(70, desc=f"第一遍扫描完成，找到 {len(all_file_infos)} 个匹配文件")
             
@@ -198,17 +473,14 @@ class buding_BatchImageLoader:
             pbar.update(80, desc=f"排序和限制完成，最终输出 {len(final_files)} 个文件")
             
             # 3. 准备输出数据
-            all_paths_list = []
-            for f in final_files:
-                original_path = f.get('original_path', f['path'])
-                all_paths_list.append(original_path)
+            all_paths_list = [f['path'] for f in final_files]
             
             file_count = len(all_paths_list)
             error_log_json = json.dumps(error_log, ensure_ascii=False)
             
             # 4. 第二遍扫描：加载所有最终选中的图像（返回列表）
             image_list, selected_image, selected_path, width, height = self._load_all_images(
-                final_files, image_backend, debug_mode, error_log
+                final_files, image_backend, debug_mode, error_log, max_decode_size
             )
             pbar.update(100, desc="图像加载完成")
             
@@ -237,9 +509,13 @@ class buding_BatchImageLoader:
                                  on_data_error: str, max_filesize_kb: int, min_filesize_kb: int,
                                  enable_mapping: bool, mapping_json: str, enable_negative_filter: bool,
                                  negative_keywords: str, enable_time_filter: bool, min_age_days: float,
-                                 max_age_days: float, date_filter_mode: str, debug_mode: bool, 
-                                 error_log: List[str]) -> List[Dict]:
-        """第一遍扫描：快速读取文件头和元数据进行筛选"""
+                                 max_age_days: float, date_filter_mode: str, parallel_scan_workers: int,
+                                 debug_mode: bool, error_log: List[str], sort_mode: str = "",
+                                 stop_after: int = -1) -> List[Dict]:
+        """第一遍扫描：快速读取文件头和元数据进行筛选
+        
+        stop_after >= 0 时按 sort_mode 排序后逐个读取文件头，凑够 stop_after+1 个通过全部筛选的文件即停止
+        """
         
         # 解析图像扩展名
         if image_extension == "any":
@@ -247,55 +523,108 @@ class buding_BatchImageLoader:
         else:
             extensions = [ext.strip() for ext in image_extension.split('|') if ext.strip()]
         
+        # 智能映射在扫描目录时直接应用到文件名上，不再单独遍历一遍
+        apply_mapping = self._load_semantic_mapping(mapping_json, debug_mode) if enable_mapping else None
+        
         # 获取初始文件列表
-        all_files = self._get_initial_file_list(root_dir, extensions, debug_mode, scan_max_depth)
+        all_files = self._get_initial_file_list(root_dir, extensions, debug_mode, scan_max_depth, apply_mapping)
         
         if debug_mode:
             print(f"🔍 初始扫描找到 {len(all_files)} 个图像文件")
         
-        # 智能映射处理
-        if enable_mapping:
-            all_files = self._apply_semantic_mapping(all_files, mapping_json, debug_mode)
-            if debug_mode:
-                print(f"🗺️ 智能映射处理完成")
+        need_metadata = bool(metadata_keywords.strip())
+        time_filter_active = enable_time_filter and (min_age_days > 0 or max_age_days > 0)
         
-        filtered_list = []
+        # 文件列表（路径、大小、修改时间）和筛选参数都未变化时，直接复用上次的筛选结果
+        # 时间筛选的结果随当前时间变化，启用时不复用；缓存结果是按当时的错误处理策略跳过坏文件得到的，策略也计入键
+        filter_key = (
+            hash(tuple((f['path'], f['size'], f['mtime']) for f in all_files)),
+            keywords, similarity_threshold, metadata_keywords, min_resolution, max_resolution,
+            aspect_ratio, image_backend, min_filesize_kb, max_filesize_kb, enable_mapping, mapping_json,
+            on_io_error, on_data_error,
+        )
+        if not time_filter_active:
+            cached = self._cache_get(self.cache, filter_key)
+            if cached is not None:
+                cached_files, cached_errors = cached
+                error_log.extend(cached_errors)
+                if debug_mode:
+                    print(f"⚡ 命中扫描缓存，筛选后剩余 {len(cached_files)} 个文件")
+                return [dict(f) for f in cached_files]
         
-        for file_info in all_files:
+        errors_before = len(error_log)
+        files = all_files
+        stage_counts = [("初始", len(files))]
+        
+        # 关键词只在每次扫描时解析并转小写一次
+        keyword_list = [kw.lower() for kw in keywords.split()]
+        metadata_keyword_list = [kw.lower() for kw in metadata_keywords.split()]
+        
+        # --- 阶段1: 关键词筛选（纯字符串运算，最廉价、通常也最有选择性） ---
+        if keyword_list:
+            # 关键词匹配只取决于清理后的文件名，序列帧等同名文件只需计算一次
+            keyword_match_cache: Dict[str, bool] = {}
+            
+            def keyword_matched(file_info: Dict) -> bool:
+                clean_name = file_info.get('clean_name', '')
+                matched = keyword_match_cache.get(clean_name)
+                if matched is None:
+                    matched = self._check_keywords_match(file_info, keyword_list, similarity_threshold)
+                    keyword_match_cache[clean_name] = matched
+                return matched
+            
+            files = [f for f in files if keyword_matched(f)]
+            stage_counts.append(("关键词", len(files)))
+        
+        # --- 阶段2: 文件大小筛选（使用扫描时缓存的stat） ---
+        files = [f for f in files if self._check_filesize_limits(f, min_filesize_kb, max_filesize_kb)]
+        stage_counts.append(("文件大小", len(files)))
+        
+        # --- 阶段3: 时间筛选（使用扫描时缓存的stat） ---
+        if time_filter_active:
+            files = self._filter_by_timestamp(files, min_age_days, max_age_days, date_filter_mode)
+            stage_counts.append(("时间", len(files)))
+        
+        # --- 阶段4: 仅对通过廉价筛选的文件读取图像头信息（大小和修改时间未变的文件复用缓存） ---
+        lazy = stop_after >= 0
+        stopped_early = False
+        if lazy:
+            # 只需要排序后的第 stop_after 个结果：先排序，读到足够数量即可，其余文件不必打开
+            files = self._apply_smart_sorting(files, sort_mode)
+            sniffed = {}
+        else:
+            sniffed = self._sniff_headers_parallel(files, image_backend, need_metadata, parallel_scan_workers, debug_mode)
+        filtered_list = []
+        for file_info in files:
             file_path = file_info['path']
             
             try:
-                # --- 阶段1: 文件大小和IO检查 ---
-                if not self._check_filesize_limits(file_path, min_filesize_kb, max_filesize_kb):
-                    continue
-                
-                # --- 阶段2: 快速读取图像头信息 ---
-                image_info = self._extract_image_metadata_fast(file_path, image_backend, debug_mode)
+                header_key = (file_path, file_info['size'], file_info['mtime'], image_backend, need_metadata)
+                image_info = self._cache_get(self._header_cache, header_key)
+                if image_info is None:
+                    # 多进程预读的结果同样写入文件头缓存，之后的重新扫描不必再读取这些文件
+                    image_info = sniffed.get(file_path)
+                    if image_info is None:
+                        image_info = self._extract_image_metadata_fast(file_path, image_backend, debug_mode, need_metadata)
+                    if image_info:
+                        self._cache_put(self._header_cache, header_key, image_info, self.HEADER_CACHE_MAX_ENTRIES)
                 if not image_info:
                     continue
                 
                 # 合并基础信息和图像信息
                 file_info.update(image_info)
                 
-                # --- 阶段3: 应用所有筛选条件 ---
-                
-                # 关键词筛选
-                if keywords.strip() and not self._check_keywords_match(file_info, keywords, similarity_threshold):
-                    continue
-                
-                # 分辨率筛选
-                if not self._check_resolution_limits(file_info, min_resolution, max_resolution):
-                    continue
-                
-                # 宽高比筛选
-                if not self._check_aspect_ratio(file_info, aspect_ratio):
-                    continue
-                
-                # 元数据关键词筛选
-                if metadata_keywords.strip() and not self._check_metadata_keywords(file_info, metadata_keywords):
-                    continue
+                if lazy:
+                    # 逐个文件立即应用剩余筛选，计数才对应最终列表中的索引
+                    if need_metadata and not self._check_metadata_keywords(file_info, metadata_keyword_list):
+                        continue
+                    if not self._filter_by_dimensions([file_info], min_resolution, max_resolution, aspect_ratio):
+                        continue
                 
                 filtered_list.append(file_info)
+                if lazy and len(filtered_list) > stop_after:
+                    stopped_early = True
+                    break
                 
             except FileNotFoundError as e:
                 if on_io_error == "停止并报错":
@@ -313,14 +642,83 @@ class buding_BatchImageLoader:
                     if debug_mode:
                         print(f"⚠️ [Data Error] 文件损坏，跳过: {file_path} ({e})")
                     continue
+        stage_counts.append(("读取文件头", len(filtered_list)))
+        
+        # --- 阶段5: 元数据关键词筛选 ---
+        if need_metadata:
+            filtered_list = [f for f in filtered_list if self._check_metadata_keywords(f, metadata_keyword_list)]
+            stage_counts.append(("元数据", len(filtered_list)))
+        
+        # --- 阶段6: 分辨率和宽高比批量筛选 ---
+        filtered_list = self._filter_by_dimensions(filtered_list, min_resolution, max_resolution, aspect_ratio)
+        stage_counts.append(("分辨率/宽高比", len(filtered_list)))
+        
+        if not time_filter_active and not stopped_early:
+            self._cache_put(self.cache, filter_key,
+                            ([dict(f) for f in filtered_list], error_log[errors_before:]), self.CACHE_MAX_ENTRIES)
         
         if debug_mode:
+            print("📊 各阶段筛选后剩余: " + " → ".join(f"{name} {count}" for name, count in stage_counts))
+            if stopped_early:
+                print(f"⚡ 已找到索引 {stop_after} 对应的文件，跳过剩余 {len(files) - files.index(file_info) - 1} 个文件的读取")
             print(f"✅ 第一遍扫描完成，筛选后剩余 {len(filtered_list)} 个文件")
         
         return filtered_list
 
-    def _get_initial_file_list(self, root_dir: str, extensions: Union[List[str], None], debug_mode: bool, scan_max_depth: int) -> List[Dict]:
-        """获取初始文件列表"""
+    def _sniff_headers_parallel(self, files: List[Dict], backend: str, need_metadata: bool,
+                                workers: int, debug_mode: bool) -> Dict[str, Dict[str, Any]]:
+        """超大目录下用多进程读取未缓存文件的图像头信息，返回 路径 -> 图像信息；未启用、系统不支持fork或失败时返回空字典"""
+        if workers <= 0 or _FORK_CONTEXT is None:
+            return {}
+        
+        paths = [
+            f['path'] for f in files
+            if (f['path'], f['size'], f['mtime'], backend, need_metadata) not in self._header_cache
+        ]
+        if len(paths) <= _PARALLEL_SCAN_MIN_FILES:
+            return {}
+        
+        workers = min(workers, os.cpu_count() or 1)
+        shard_size = -(-len(paths) // workers)
+        shards = [(paths[i:i + shard_size], backend, need_metadata) for i in range(0, len(paths), shard_size)]
+        
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_FORK_CONTEXT) as executor:
+                shard_results = list(executor.map(_scan_shard, shards, chunksize=1))
+        except Exception as e:
+            # 进程池不可用（如无法序列化、子进程崩溃）时回退到单进程逐个读取
+            if debug_mode:
+                print(f"⚠️ 多进程扫描失败，回退到单进程: {e}")
+            return {}
+        
+        if debug_mode:
+            print(f"🚀 多进程读取文件头: {len(paths)} 个文件, {workers} 个进程")
+        
+        return {
+            path: info
+            for (shard_paths, _, _), infos in zip(shards, shard_results)
+            for path, info in zip(shard_paths, infos)
+        }
+
+    @staticmethod
+    def _cache_get(store: OrderedDict, key: Tuple) -> Any:
+        """读取LRU缓存，命中时移到末尾"""
+        value = store.get(key)
+        if value is not None:
+            store.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _cache_put(store: OrderedDict, key: Tuple, value: Any, max_entries: int) -> None:
+        """写入LRU缓存，超出容量时淘汰最久未使用的条目"""
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > max_entries:
+            store.popitem(last=False)
+
+    def _get_initial_file_list(self, root_dir: str, extensions: Union[List[str], None], debug_mode: bool, scan_max_depth: int,
+                               apply_mapping: Union[Callable[[str], str], None] = None) -> List[Dict]:
+        """获取初始文件列表（启用映射时，filename和clean_name使用映射后的文件名，path保持真实路径）"""
         # 清理路径
         root_dir = root_dir.strip().strip('"\'')
         
@@ -331,28 +729,42 @@ class buding_BatchImageLoader:
         
         # 扫描目录
         all_files = []
-        root_path = Path(root_dir)
+        ext_tuple = tuple(ext.lower() for ext in extensions) if extensions is not None else None
         
         def scan_directory_with_depth(directory: str, current_depth: int):
-            """递归扫描目录，控制深度"""
+            """递归扫描目录，控制深度（scandir 复用目录项缓存的类型信息，避免逐项 stat）"""
             if current_depth > scan_max_depth:
                 return
             
             try:
-                for item in os.listdir(directory):
-                    item_path = os.path.join(directory, item)
-                    if os.path.isfile(item_path):
-                        # 检查扩展名
-                        if extensions is None or any(item_path.lower().endswith(ext.lower()) for ext in extensions):
-                            file_info = {
-                                'path': item_path,
-                                'filename': os.path.basename(item_path),
-                                'clean_name': self._clean_filename_for_match(os.path.basename(item_path))
-                            }
-                            all_files.append(file_info)
-                    elif os.path.isdir(item_path):
-                        # 递归扫描子目录
-                        scan_directory_with_depth(item_path, current_depth + 1)
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            # 检查扩展名
+                            if ext_tuple is None or entry.name.lower().endswith(ext_tuple):
+                                # 扫描时读取一次stat，后续大小筛选和排序直接复用
+                                try:
+                                    stat = entry.stat()
+                                except OSError:
+                                    continue
+                                filename = entry.name
+                                if apply_mapping is not None:
+                                    filename = apply_mapping(filename)
+                                    if debug_mode and filename != entry.name:
+                                        print(f"  🔄 {entry.path} → {filename}")
+                                file_info = {
+                                    'path': entry.path,
+                                    'filename': filename,
+                                    'clean_name': self._clean_filename_for_match(filename),
+                                    'size': stat.st_size,
+                                    'size_kb': stat.st_size >> 10,
+                                    'mtime': stat.st_mtime,
+                                    'ctime': stat.st_ctime,
+                                }
+                                all_files.append(file_info)
+                        elif entry.is_dir():
+                            # 递归扫描子目录
+                            scan_directory_with_depth(entry.path, current_depth + 1)
             except PermissionError:
                 if debug_mode:
                     print(f"⚠️ 无权限访问目录: {directory}")
@@ -371,138 +783,100 @@ class buding_BatchImageLoader:
         
         return all_files
 
-    def _apply_semantic_mapping(self, files: List[Dict], mapping_json: str, debug_mode: bool) -> List[Dict]:
-        """应用语义映射，将文件路径中的代号替换为规范化关键词"""
+    def _load_semantic_mapping(self, mapping_json: str, debug_mode: bool) -> Union[Callable[[str], str], None]:
+        """解析映射JSON，返回把文件名中的代号替换为规范化关键词的函数；映射为空或无效时返回None"""
         if not mapping_json or not mapping_json.strip():
             if debug_mode:
                 print("⚠️ 映射JSON为空，跳过语义映射")
-            return files
+            return None
         
         try:
-            # 解析映射JSON
-            mapping_dict = json.loads(mapping_json)
+            # 解析映射JSON（orjson的解析错误同样是json.JSONDecodeError的子类）
+            mapping_dict = _parse_mapping_json(mapping_json)
             if not isinstance(mapping_dict, dict):
                 if debug_mode:
                     print("❌ 映射JSON格式错误：必须是字典格式")
-                return files
+                return None
             
             if debug_mode:
                 print(f"🗺️ 应用语义映射，共 {len(mapping_dict)} 条规则")
                 for old, new in mapping_dict.items():
                     print(f"  • {old} → {new}")
             
-            # 对每个文件应用映射
-            mapped_files = []
-            for file_info in files:
-                original_path = file_info['path']
-                original_filename = file_info['filename']
-                original_clean_name = file_info['clean_name']
-                
-                # 应用映射到完整路径
-                mapped_path = original_path
-                mapped_filename = original_filename
-                
-                # 对路径中的每个部分应用映射
-                path_parts = original_path.replace('\\', '/').split('/')
-                mapped_parts = []
-                
-                for part in path_parts:
-                    mapped_part = part
-                    for old_term, new_term in mapping_dict.items():
-                        if old_term in mapped_part:
-                            mapped_part = mapped_part.replace(old_term, new_term)
-                    mapped_parts.append(mapped_part)
-                
-                mapped_path = '\\'.join(mapped_parts) if '\\' in original_path else '/'.join(mapped_parts)
-                
-                # 对文件名应用映射
-                for old_term, new_term in mapping_dict.items():
-                    if old_term in mapped_filename:
-                        mapped_filename = mapped_filename.replace(old_term, new_term)
-                
-                # 重新计算映射后的clean_name
-                mapped_clean_name = self._clean_filename_for_match(mapped_filename)
-                
-                # 创建新的文件信息对象
-                mapped_file_info = file_info.copy()
-                mapped_file_info.update({
-                    'path': mapped_path,
-                    'filename': mapped_filename,
-                    'clean_name': mapped_clean_name,
-                    'original_path': original_path,  # 保留原始路径用于最终输出
-                })
-                
-                mapped_files.append(mapped_file_info)
-                
-                if debug_mode and (mapped_path != original_path or mapped_filename != original_filename):
-                    print(f"  🔄 {original_path} → {mapped_path}")
-            
-            if debug_mode:
-                print(f"✅ 语义映射完成，处理了 {len(mapped_files)} 个文件")
-            
-            return mapped_files
+            # 所有规则编译为一个正则，每个字符串只扫描一次
+            return _build_mapping_replacer(mapping_dict)
             
         except json.JSONDecodeError as e:
             if debug_mode:
                 print(f"❌ 映射JSON解析失败: {e}")
-            return files
+            return None
         except Exception as e:
             if debug_mode:
                 print(f"❌ 语义映射应用失败: {e}")
-            return files
+            return None
 
-    def _check_keywords_match(self, file_info: Dict, keywords_str: str, threshold: float) -> bool:
-        """检查关键词匹配"""
-        if not keywords_str.strip():
+    def _check_keywords_match(self, file_info: Dict, keywords: List[str], threshold: float) -> bool:
+        """检查关键词匹配（keywords 为已转小写的关键词列表，clean_name 本身已是小写）"""
+        if not keywords:
             return True
         
-        # 解析关键词列表
-        keywords = [kw.strip().lower() for kw in keywords_str.split() if kw.strip()]
-        clean_filename = file_info.get('clean_name', '').lower()
+        clean_filename = file_info.get('clean_name', '')
+        matcher = None
         
         for keyword in keywords:
-            if not keyword:
-                continue
-            
             # 精确匹配
             if keyword == clean_filename:
                 return True
             
-            # 包含匹配
-            if keyword in clean_filename or clean_filename in keyword:
+            # 包含匹配（双向；清理后为空的文件名不算被任何关键词包含）
+            if keyword in clean_filename or (clean_filename and clean_filename in keyword):
                 return True
             
-            # 模糊匹配
+            # 模糊匹配：文件名作为seq2只建一次索引；先用廉价上界排除，再计算精确相似度
             if threshold > 0:
-                import difflib
-                similarity = difflib.SequenceMatcher(None, keyword, clean_filename).ratio()
-                if similarity >= threshold:
+                if matcher is None:
+                    matcher = difflib.SequenceMatcher(None, '', clean_filename)
+                matcher.set_seq1(keyword)
+                if (matcher.real_quick_ratio() >= threshold
+                        and matcher.quick_ratio() >= threshold
+                        and matcher.ratio() >= threshold):
                     return True
         
         return False
 
-    def _check_filesize_limits(self, file_path: str, min_kb: int, max_kb: int) -> bool:
-        """检查文件大小限制"""
-        try:
-            file_size_bytes = os.path.getsize(file_path)
-            file_size_kb = file_size_bytes // 1024
-            
-            if min_kb > 0 and file_size_kb < min_kb:
-                return False
-            if max_kb > 0 and file_size_kb > max_kb:
-                return False
-            
-            return True
-        except OSError:
+    def _check_filesize_limits(self, file_info: Dict, min_kb: int, max_kb: int) -> bool:
+        """检查文件大小限制（使用扫描阶段缓存的大小）"""
+        file_size_kb = file_info['size_kb']
+        
+        if min_kb > 0 and file_size_kb < min_kb:
+            return False
+        if max_kb > 0 and file_size_kb > max_kb:
             return False
+        
+        return True
 
-    def _extract_image_metadata_fast(self, file_path: str, backend: str, debug_mode: bool) -> Dict[str, Any]:
+    def _filter_by_timestamp(self, files: List[Dict], min_age_days: float, max_age_days: float,
+                             date_filter_mode: str) -> List[Dict]:
+        """按时间戳筛选文件（使用扫描阶段缓存的mtime/ctime，直接比较时间戳）"""
+        now = time.time()
+        min_time = now - min_age_days * 86400 if min_age_days > 0 else None
+        max_time = now - max_age_days * 86400 if max_age_days > 0 else None
+        time_field = 'mtime' if date_filter_mode == "修改时间" else 'ctime'
+        
+        return [
+            f for f in files
+            if (min_time is None or f[time_field] >= min_time)
+            and (max_time is None or f[time_field] <= max_time)
+        ]
+
+    def _extract_image_metadata_fast(self, file_path: str, backend: str, debug_mode: bool, 
+                                     need_metadata: bool = False) -> Dict[str, Any]:
         """快速提取图像元数据（不加载像素数据）"""
         try:
             if backend == "OpenCV":
                 return self._extract_metadata_opencv_fast(file_path, debug_mode)
             else:
-                return self._extract_metadata_pillow_fast(file_path, debug_mode)
+                return self._extract_metadata_pillow_fast(file_path, debug_mode, need_metadata)
         except Exception as e:
             if debug_mode:
                 print(f"⚠️ 元数据提取失败 {file_path}: {e}")
@@ -511,7 +885,30 @@ class buding_BatchImageLoader:
     def _extract_metadata_opencv_fast(self, file_path: str, debug_mode: bool) -> Dict[str, Any]:
         """OpenCV快速元数据提取"""
         try:
-            # 使用cv2.imread只读取头信息
+            # 优先解析文件头；其他格式交给Pillow惰性打开（只解析头部，不解码像素）；都失败时才完整读取
+            header = _read_dims_from_header(file_path)
+            if header:
+                width, height, channels, _ = header
+                return {
+                    'width': width,
+                    'height': height,
+                    'channels': channels,
+                    'metadata_text': '',  # OpenCV不读取PNG元数据
+                }
+            
+            if PILLOW_AVAILABLE:
+                try:
+                    with Image.open(file_path) as pil_img:
+                        width, height = pil_img.size
+                        return {
+                            'width': width,
+                            'height': height,
+                            'channels': len(pil_img.getbands()),
+                            'metadata_text': '',  # OpenCV不读取PNG元数据
+                        }
+                except Exception:
+                    pass
+            
             img = cv2.imread(file_path, cv2.IMREAD_IGNORE_ORIENTATION | cv2.IMREAD_UNCHANGED)
             if img is None:
                 return {}
@@ -530,9 +927,23 @@ class buding_BatchImageLoader:
                 print(f"OpenCV元数据提取失败: {e}")
             return {}
 
-    def _extract_metadata_pillow_fast(self, file_path: str, debug_mode: bool) -> Dict[str, Any]:
+    def _extract_metadata_pillow_fast(self, file_path: str, debug_mode: bool, need_metadata: bool = False) -> Dict[str, Any]:
         """Pillow快速元数据提取"""
         try:
+            # 不需要元数据关键词筛选时只解析文件头；PNG的文本块直接按块读取，无需构造Image对象
+            header = _read_dims_from_header(file_path)
+            if header and (not need_metadata or header[3] == 'PNG'):
+                width, height, channels, image_format = header
+                metadata_text = ''
+                if need_metadata:
+                    metadata_text = ' '.join(_read_png_text_chunks(file_path, _METADATA_KEYS))
+                return {
+                    'width': width,
+                    'height': height,
+                    'channels': channels,
+                    'metadata_text': metadata_text,
+                }
+            
             with Image.open(file_path) as img:
                 # 只读取尺寸信息，不加载像素数据
                 width, height = img.size
@@ -542,7 +953,7 @@ class buding_BatchImageLoader:
                 metadata_text = ''
                 if hasattr(img, 'info') and img.info:
                     for key, value in img.info.items():
-                        if key.lower() in ['parameters', 'prompt', 'negative_prompt', 'description']:
+                        if key.lower() in _METADATA_KEYS:
                             metadata_text += str(value) + ' '
                 
                 return {
@@ -556,59 +967,42 @@ class buding_BatchImageLoader:
                 print(f"Pillow元数据提取失败: {e}")
             return {}
 
-    def _check_resolution_limits(self, file_info: Dict, min_res: int, max_res: int) -> bool:
-        """检查分辨率限制"""
-        width = file_info.get('width', 0)
-        height = file_info.get('height', 0)
-        
-        if width == 0 or height == 0:
-            return False
-        
-        if min_res > 0 and (width < min_res or height < min_res):
-            return False
-        
-        if max_res > 0 and (width > max_res or height > max_res):
-            return False
+    def _filter_by_dimensions(self, files: List[Dict], min_res: int, max_res: int, target_ratio: str) -> List[Dict]:
+        """按分辨率和宽高比批量筛选：宽高整理为数组后一次性计算掩码"""
+        if not files:
+            return files
         
-        return True
-
-    def _check_aspect_ratio(self, file_info: Dict, target_ratio: str) -> bool:
-        """检查宽高比"""
-        if target_ratio == "any":
-            return True
+        count = len(files)
+        widths = np.fromiter((f.get('width', 0) for f in files), dtype=np.int64, count=count)
+        heights = np.fromiter((f.get('height', 0) for f in files), dtype=np.int64, count=count)
         
-        width = file_info.get('width', 0)
-        height = file_info.get('height', 0)
+        mask = (widths > 0) & (heights > 0)
         
-        if width == 0 or height == 0:
-            return False
+        # 分辨率限制
+        if min_res > 0:
+            mask &= (widths >= min_res) & (heights >= min_res)
+        if max_res > 0:
+            mask &= (widths <= max_res) & (heights <= max_res)
         
+        # 宽高比
         if target_ratio == "portrait":
-            return height > width
-        
-        # 预定义宽高比
-        ratios = {
-            "1:1": 1.0,
-            "16:9": 16.0 / 9.0,
-            "4:3": 4.0 / 3.0,
-            "3:2": 3.0 / 2.0,
-        }
-        
-        expected = ratios.get(target_ratio)
-        if expected is None:
-            return True
+            mask &= heights > widths
+        else:
+            expected = _ASPECT_RATIOS.get(target_ratio)
+            if expected is not None:
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    actual = widths / heights
+                # 允许10%的误差
+                mask &= np.abs(actual - expected) < 0.1
         
-        actual = width / height
-        # 允许10%的误差
-        return abs(actual - expected) < 0.1
+        return [files[i] for i in np.flatnonzero(mask)]
 
-    def _check_metadata_keywords(self, file_info: Dict, keywords_str: str) -> bool:
-        """检查元数据关键词"""
-        if not keywords_str.strip():
+    def _check_metadata_keywords(self, file_info: Dict, keywords: List[str]) -> bool:
+        """检查元数据关键词（keywords 为已转小写的关键词列表）"""
+        if not keywords:
             return True
         
         metadata_text = file_info.get('metadata_text', '').lower()
-        keywords = [kw.strip().lower() for kw in keywords_str.split() if kw.strip()]
         
         for keyword in keywords:
             if keyword in metadata_text:
@@ -622,16 +1016,16 @@ class buding_BatchImageLoader:
         name = os.path.splitext(filename)[0]
         
         # 移除常见的版本号和分隔符
-        name = re.sub(r'[_\-\s]+', ' ', name)
+        name = _RE_SEP.sub(' ', name)
         
         # 移除数字版本标识
-        name = re.sub(r'[ _]?[vV][0-9]+', '', name)
+        name = _RE_VER.sub('', name)
         
         # 移除纯数字（但保留中文数字）
-        name = re.sub(r'\b\d+\b', '', name)
+        name = _RE_NUM.sub('', name)
         
         # 只保留字母、中文、空格、基本标点
-        name = re.sub(r'[^\w\u4e00-\u9fff\s\-_\.\(\)\[\]]', '', name)
+        name = _RE_KEEP.sub('', name)
         
         return name.lower().strip()
 
@@ -647,9 +1041,7 @@ class buding_BatchImageLoader:
         
         # 随机选择
         if random_selection:
-            if seed != 0:
-                random.seed(seed)
-            random.shuffle(sorted_files)
+            sorted_files = self._shuffled(sorted_files, seed)
         
         # 索引选择
         if select_index >= 0 and select_index < len(sorted_files):
@@ -691,17 +1083,22 @@ class buding_BatchImageLoader:
             return sorted(files, key=lambda x: x['size'])
         
         elif sort_mode == "随机排序":
-            shuffled = files.copy()
-            random.shuffle(shuffled)
-            return shuffled
+            return self._shuffled(files)
         
         else:
             return files
 
-    def _load_all_images(self, final_files: List[Dict], backend: str, debug_mode: bool, error_log: List[str]) -> Tuple[List[torch.Tensor], torch.Tensor, str, int, int]:
+    @staticmethod
+    def _shuffled(files: List[Dict], seed: int = 0) -> List[Dict]:
+        """随机打乱文件列表（NumPy PCG64生成排列），seed为0时不固定种子"""
+        permutation = np.random.default_rng(seed or None).permutation(len(files))
+        return [files[i] for i in permutation]
+
+    def _load_all_images(self, final_files: List[Dict], backend: str, debug_mode: bool, error_log: List[str],
+                         max_decode_size: int = 0) -> Tuple[List[torch.Tensor], torch.Tensor, str, int, int]:
         """第二遍扫描：加载所有最终选中的图像（返回列表）"""
         if not final_files:
-            return [], torch.zeros(1, 64, 64, 3), "", 0, 0
+            return [], _EMPTY_IMAGE_TENSOR, "", 0, 0
         
         image_list = []
         selected_image = None
@@ -709,34 +1106,60 @@ class buding_BatchImageLoader:
         width = 0
         height = 0
         
-        for idx, file_info in enumerate(final_files):
-            file_path = file_info.get('original_path', file_info['path'])
-            
+        # OpenCV后端的JPEG可按目标尺寸缩小解码，解码后尺寸为原尺寸除以倍数向上取整
+        if backend == "OpenCV":
+            factors = [_jpeg_reduce_factor(f, max_decode_size) for f in final_files]
+        else:
+            factors = [1] * len(final_files)
+        
+        # 所有图像尺寸一致时预分配整批缓冲区，各图直接解码写入对应切片（输出张量共享同一块内存）
+        sizes = {(-(-f.get('width', 0) // factor), -(-f.get('height', 0) // factor))
+                 for f, factor in zip(final_files, factors)}
+        batch_buffer = None
+        if len(final_files) > 1 and len(sizes) == 1:
+            batch_width, batch_height = next(iter(sizes))
+            if batch_width > 0 and batch_height > 0:
+                batch_buffer = np.empty((len(final_files), batch_height, batch_width, 3), dtype=np.float32)
+        elif len(sizes) > 1 and debug_mode:
+            print(f"⚠️ 图像尺寸不一致（{len(sizes)} 种），逐张分配内存")
+        
+        def decode(idx: int, file_info: Dict) -> Tuple[str, Union[torch.Tensor, None], Union[Exception, None]]:
+            file_path = file_info['path']
+            out = batch_buffer[idx] if batch_buffer is not None else None
             try:
                 if backend == "OpenCV":
-                    image_tensor = self._load_image_opencv(file_path, debug_mode)
-                else:
-                    image_tensor = self._load_image_pillow(file_path, debug_mode)
-                
-                image_list.append(image_tensor)
-                
-                # 第一张图作为选中的预览图
-                if idx == 0:
-                    selected_image = image_tensor
-                    selected_path = file_path
-                    width = file_info.get('width', 0)
-                    height = file_info.get('height', 0)
-                
+                    return file_path, self._load_image_opencv(file_path, debug_mode, out, factors[idx]), None
+                if backend == "pyvips":
+                    return file_path, self._load_image_pyvips(file_path, debug_mode, out), None
+                return file_path, self._load_image_pillow(file_path, debug_mode, out), None
             except Exception as e:
-                error_msg = f"图像加载失败 {file_path}: {e}"
+                return file_path, None, e
+        
+        # OpenCV/Pillow 解码时会释放GIL，多线程并行解码；结果按原顺序收集
+        if len(final_files) > 1 and (os.cpu_count() or 1) > 1:
+            results = list(self._get_executor().map(decode, range(len(final_files)), final_files))
+        else:
+            results = [decode(idx, file_info) for idx, file_info in enumerate(final_files)]
+        
+        for idx, (file_info, (file_path, image_tensor, error)) in enumerate(zip(final_files, results)):
+            if error is not None:
+                error_msg = f"图像加载失败 {file_path}: {error}"
                 error_log.append(error_msg)
                 if debug_mode:
                     print(f"🚨 [Load Error] {error_msg}")
                 continue
+            
+            image_list.append(image_tensor)
+            
+            # 第一张图作为选中的预览图（尺寸取实际解码结果，缩小解码时与文件头尺寸不同）
+            if idx == 0:
+                selected_image = image_tensor
+                selected_path = file_path
+                height, width = image_tensor.shape[1], image_tensor.shape[2]
         
         # 如果没有加载任何图像，返回空
         if not image_list:
-            return [], torch.zeros(1, 64, 64, 3), "", 0, 0
+            return [], _EMPTY_IMAGE_TENSOR, "", 0, 0
         
         # 确保selected_image不为空
         if selected_image is None:
@@ -744,19 +1167,30 @@ class buding_BatchImageLoader:
         
         return image_list, selected_image, selected_path, width, height
 
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        """获取共享的解码线程池"""
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=min(32, os.cpu_count() or 1),
+                                                   thread_name_prefix="buding_image_decode")
+            return cls._executor
+
     def _load_selected_image(self, final_files: List[Dict], backend: str, debug_mode: bool, error_log: List[str]) -> Tuple[torch.Tensor, str, int, int]:
         """第二遍扫描：加载最终选中的图像"""
         if not final_files:
-            return torch.zeros(1, 64, 64, 3), "", 0, 0
+            return _EMPTY_IMAGE_TENSOR, "", 0, 0
         
         selected_file = final_files[0]
-        selected_path = selected_file.get('original_path', selected_file['path'])
+        selected_path = selected_file['path']
         width = selected_file.get('width', 0)
         height = selected_file.get('height', 0)
         
         try:
             if backend == "OpenCV":
                 image_tensor = self._load_image_opencv(selected_path, debug_mode)
+            elif backend == "pyvips":
+                image_tensor = self._load_image_pyvips(selected_path, debug_mode)
             else:
                 image_tensor = self._load_image_pillow(selected_path, debug_mode)
             
@@ -769,21 +1203,39 @@ class buding_BatchImageLoader:
                 print(f"🚨 [Final Load Error] {error_msg}")
             
             # 返回空张量，防止工作流中断
-            return torch.zeros(1, 64, 64, 3), selected_path, 0, 0
+            return _EMPTY_IMAGE_TENSOR, selected_path, 0, 0
 
-    def _load_image_opencv(self, file_path: str, debug_mode: bool) -> torch.Tensor:
-        """使用OpenCV加载图像"""
+    def _decode_cached(self, file_path: str, backend: str, decode: Callable[[str], np.ndarray]) -> np.ndarray:
+        """解码为uint8 RGB数组；文件未变化时复用上次的解码结果，跳过读盘和解码"""
+        stat = os.stat(file_path)
+        key = (file_path, stat.st_mtime, stat.st_size, backend)
+        with self._decode_cache_lock:
+            img = self._cache_get(self._decode_cache, key)
+        if img is not None:
+            return img
+        
+        img = decode(file_path)
+        img.flags.writeable = False  # 缓存的数组被多次共享，禁止原地修改
+        if img.nbytes <= self.DECODE_CACHE_MAX_BYTES:
+            with self._decode_cache_lock:
+                self._cache_put(self._decode_cache, key, img, self.DECODE_CACHE_MAX_ENTRIES)
+                while sum(a.nbytes for a in self._decode_cache.values()) > self.DECODE_CACHE_MAX_BYTES:
+                    self._decode_cache.popitem(last=False)
+        return img
+
+    def _load_image_opencv(self, file_path: str, debug_mode: bool, out: Union[np.ndarray, None] = None,
+                           reduce_factor: int = 1) -> torch.Tensor:
+        """使用OpenCV加载图像；out 为尺寸匹配的预分配缓冲区时直接写入其中；reduce_factor>1时JPEG缩小解码"""
         try:
-            img = cv2.imread(file_path, cv2.IMREAD_COLOR)
-            if img is None:
-                raise ValueError("OpenCV无法读取图像文件")
-            
-            # BGR转RGB
-            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+            img = self._decode_cached(file_path, f"OpenCV/{reduce_factor}",
+                                      lambda path: _decode_rgb_opencv(path, reduce_factor))
             
-            # 转换为张量
-            img = img.astype(np.float32) / 255.0
-            tensor = torch.from_numpy(img)[None,]  # 添加batch维度
+            # 查表完成 uint8 -> float32 归一化（一次遍历，无中间缓冲区）
+            if out is not None and out.shape == img.shape:
+                img = cv2.LUT(img, _U8_TO_F01_LUT, dst=out)
+            else:
+                img = cv2.LUT(img, _U8_TO_F01_LUT)
+            tensor = torch.from_numpy(img).unsqueeze_(0)  # 添加batch维度
             
             return tensor
             
@@ -792,26 +1244,44 @@ class buding_BatchImageLoader:
                 print(f"OpenCV加载失败: {e}")
             raise
 
-    def _load_image_pillow(self, file_path: str, debug_mode: bool) -> torch.Tensor:
-        """使用Pillow加载图像"""
+    def _load_image_pillow(self, file_path: str, debug_mode: bool, out: Union[np.ndarray, None] = None) -> torch.Tensor:
+        """使用Pillow加载图像；out 为尺寸匹配的预分配缓冲区时直接写入其中"""
         try:
-            with Image.open(file_path) as img:
-                # 转换为RGB
-                img = img.convert("RGB")
-                
-                # 转换为numpy数组
-                img_array = np.array(img).astype(np.float32) / 255.0
-                
-                # 转换为张量
-                tensor = torch.from_numpy(img_array)[None,]  # 添加batch维度
-                
-                return tensor
-                
+            img_array = self._decode_cached(file_path, "Pillow", _decode_rgb_pillow)
+            
+            # 转换为张量：转float32只分配一次，再原地缩放到[0, 1]
+            if out is not None and out.shape == img_array.shape:
+                tensor = torch.from_numpy(np.divide(img_array, np.float32(255.0), out=out))
+            else:
+                tensor = torch.from_numpy(img_array.astype(np.float32)).div_(255.0)
+            tensor = tensor.unsqueeze_(0)  # 添加batch维度
+            
+            return tensor
+            
         except Exception as e:
             if debug_mode:
                 print(f"Pillow加载失败: {e}")
             raise
 
+    def _load_image_pyvips(self, file_path: str, debug_mode: bool, out: Union[np.ndarray, None] = None) -> torch.Tensor:
+        """使用pyvips加载图像；out 为尺寸匹配的预分配缓冲区时直接写入其中"""
+        try:
+            img_array = self._decode_cached(file_path, "pyvips", _decode_rgb_pyvips)
+            
+            # 转换为张量：转float32只分配一次，再原地缩放到[0, 1]
+            if out is not None and out.shape == img_array.shape:
+                tensor = torch.from_numpy(np.divide(img_array, np.float32(255.0), out=out))
+            else:
+                tensor = torch.from_numpy(img_array.astype(np.float32)).div_(255.0)
+            tensor = tensor.unsqueeze_(0)  # 添加batch维度
+            
+            return tensor
+            
+        except Exception as e:
+            if debug_mode:
+                print(f"pyvips加载失败: {e}")
+            raise
+
 # 注册节点
 NODE_CLASS_MAPPINGS = {
     "buding_BatchImageLoader": buding_BatchImageLoader,
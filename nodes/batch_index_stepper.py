@@ -10,24 +10,49 @@ import time
 import traceback  # ✅ 规范化导入，避免异常处理中导入
 from typing import Dict, Any
 
+# 进度条长度固定，所有可能的进度条（0~20 格填充）在导入时预先生成
+_BAR_LENGTH = 20
+_BARS = tuple("█" * filled + "░" * (_BAR_LENGTH - filled) for filled in range(_BAR_LENGTH + 1))
+
+
+class _StepperState:
+    """单个步进器实例的计数状态（__slots__ 固定字段，无实例字典）"""
+
+    __slots__ = (
+        'current_batch_run',
+        'total_processed_batches',
+        'total_skipped_files',
+        'last_reset_time',
+        'task_start_time',
+        'last_seen_batch_run',
+    )
+
+    def __init__(self):
+        self.current_batch_run = 0
+        self.total_processed_batches = 0
+        self.total_skipped_files = 0
+        self.last_reset_time = time.time()
+        self.task_start_time = None  # 本次任务开始时间：最近一次批次推进(自增)的时间
+        self.last_seen_batch_run = None  # 用于判断是否进入了新批次（避免同一批次重复刷新时间）
+
+    def as_dict(self) -> Dict[str, Any]:
+        """导出为普通字典（用于统计信息输出）"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
 class buding_BatchIndexStepper:
     """增强版批量索引步进器 - 智能化批量处理的索引计算器"""
     
-    # ✅ 使用字典管理多实例状态（key: instance_id, value: 状态字典）
+    # ✅ 使用字典管理多实例状态（key: instance_id, value: _StepperState）
     _instances_state = {}
+    # ✅ 所有实例 total_processed_batches 之和，随各实例计数同步增减，IS_CHANGED 无需逐实例求和
+    _global_processed_batches = 0
     
     def __init__(self):
         """初始化实例状态，确保多实例独立计数"""
         self.instance_id = id(self)  # 使用对象地址作为唯一标识
         if self.instance_id not in buding_BatchIndexStepper._instances_state:
-            buding_BatchIndexStepper._instances_state[self.instance_id] = {
-                'current_batch_run': 0,
-                'total_processed_batches': 0,
-                'total_skipped_files': 0,
-                'last_reset_time': time.time(),
-                'task_start_time': None,  # 本次任务开始时间：最近一次批次推进(自增)的时间
-                'last_seen_batch_run': None,  # 用于判断是否进入了新批次（避免同一批次重复刷新时间）
-            }
+            buding_BatchIndexStepper._instances_state[self.instance_id] = _StepperState()
     
     @classmethod
     def INPUT_TYPES(cls):
@@ -58,35 +83,28 @@ class buding_BatchIndexStepper:
         """✅ 智能参数追踪：包含所有参数和内部状态，避免无谓的随机刷新"""
         # ✅ 改进：包含所有参数 + 内部状态，让 ComfyUI 准确检测变化
         # 注意：由于 _instances_state 是全局的，这里使用类级别的统计信息
-        key_params = {
-            'base_start_index': base_start_index,
-            'max_files_per_batch': max_files_per_batch,
-            'reset_counter': reset_counter,
-            'total_count': total_count,
-            'debug_mode': debug_mode,
-            # ← 追踪全局处理统计（表示是否有新批次完成）
-            'total_processed_batches': cls._get_global_processed_batches(),
-        }
-        return hash(frozenset(key_params.items()))  # ✅ 使用 frozenset，避免 str() 转换
+        # ✅ 固定顺序的元组直接求哈希，不构造字典和 frozenset
+        return hash((
+            base_start_index,
+            max_files_per_batch,
+            reset_counter,
+            total_count,
+            debug_mode,
+            cls._get_global_processed_batches(),  # ← 追踪全局处理统计（表示是否有新批次完成）
+        ))
     
     @classmethod
     def _get_global_processed_batches(cls):
         """获取全局已处理批次数（用于 IS_CHANGED 追踪）"""
-        total = 0
-        for state in cls._instances_state.values():
-            total += state.get('total_processed_batches', 0)
-        return total
+        return cls._global_processed_batches
     
     def _perform_reset(self, debug_mode: bool = False):
         """执行重置操作（实例级别）"""
-        buding_BatchIndexStepper._instances_state[self.instance_id] = {
-            'current_batch_run': 0,
-            'total_processed_batches': 0,
-            'total_skipped_files': 0,
-            'last_reset_time': time.time(),
-            'task_start_time': None,  # 重置后，首次运行用 last_reset_time 显示；随后每次批次推进时刷新
-            'last_seen_batch_run': None,
-        }
+        old_state = buding_BatchIndexStepper._instances_state.get(self.instance_id)
+        if old_state is not None:
+            buding_BatchIndexStepper._global_processed_batches -= old_state.total_processed_batches
+        # 重置后 task_start_time 为空，随后每次批次推进时刷新
+        buding_BatchIndexStepper._instances_state[self.instance_id] = _StepperState()
         if debug_mode:
             print(f"🔄 实例 {self.instance_id} 计数器已重置")
     
@@ -101,25 +119,32 @@ class buding_BatchIndexStepper:
             
             # ✅ 获取当前实例的状态
             state = buding_BatchIndexStepper._instances_state.get(self.instance_id)
-            if not state:
+            if state is None:
                 self.__init__()  # 重新初始化如果状态丢失
                 state = buding_BatchIndexStepper._instances_state[self.instance_id]
 
             # ✅ 本次任务开始时间：每个批次“第一次执行”时记录一次
             # 说明：ComfyUI 可能在同一批次内多次执行该节点（预览/重复求值），这里用 last_seen_batch_run 去重。
-            current_batch_for_display = state['current_batch_run']
-            last_seen = state.get('last_seen_batch_run')
-            if last_seen is None or last_seen != current_batch_for_display:
-                state['last_seen_batch_run'] = current_batch_for_display
-                state['task_start_time'] = time.time()
-                if debug_mode:
-                    print(
-                        f"🕒 批次开始时间已记录: 批次={current_batch_for_display + 1}, "
-                        f"时间={time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(state['task_start_time']))}"
-                    )
+            current_batch_for_display = state.current_batch_run
+            last_seen = state.last_seen_batch_run
+            batch_started = last_seen is None or last_seen != current_batch_for_display
+            if batch_started:
+                state.last_seen_batch_run = current_batch_for_display
+                state.task_start_time = time.time()
+
+            # 开始时间字符串只格式化一次，调试输出、状态信息和历史信息共用
+            start_time_str = "未设置"
+            if state.task_start_time is not None:
+                start_time_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(state.task_start_time))
+
+            if batch_started and debug_mode:
+                print(
+                    f"🕒 批次开始时间已记录: 批次={current_batch_for_display + 1}, "
+                    f"时间={start_time_str}"
+                )
 
             # 记录当前批次（用于显示，不提前自增）
-            current_batch_for_display = state['current_batch_run']
+            current_batch_for_display = state.current_batch_run
             
             # 计算当前批次的起始索引（严格对应当前正在处理的文件）
             calculated_index = base_start_index + (current_batch_for_display * max_files_per_batch)
@@ -136,19 +161,15 @@ class buding_BatchIndexStepper:
                     current_batch_for_display = max(0, (total_count - 1) // max_files_per_batch)
                     
                     # 计算跳过的文件数
-                    skipped_count = max(0, (base_start_index + (state['current_batch_run'] * max_files_per_batch)) - total_count)
-                    state['total_skipped_files'] += skipped_count
+                    skipped_count = max(0, (base_start_index + (state.current_batch_run * max_files_per_batch)) - total_count)
+                    state.total_skipped_files += skipped_count
             
             # 生成增强的历史信息
-            history_info = self._generate_history_info(state, calculated_index, max_files_per_batch, total_count, debug_mode)
+            history_info = self._generate_history_info(state, calculated_index, max_files_per_batch, total_count, debug_mode,
+                                                       start_time_str if state.task_start_time is not None else None)
             
             # 生成可视化进度条
             progress_bar = self._generate_progress_bar(calculated_index, max_files_per_batch, total_count)
-
-            # 开始时间字符串（来源：max_files_per_batch 变化触发）
-            start_time_str = "未设置"
-            if state.get('task_start_time') is not None:
-                start_time_str = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(state['task_start_time']))
             
             # 将进度条整合到状态信息中
             if is_completed:
@@ -203,13 +224,14 @@ class buding_BatchIndexStepper:
             
             # 更新统计信息（仅在未完成时）
             if not is_completed:
-                state['total_processed_batches'] += 1
+                state.total_processed_batches += 1
+                buding_BatchIndexStepper._global_processed_batches += 1
                 # 在返回结果后自增批次计数（为下一次运行做准备）
-                state['current_batch_run'] += 1
+                state.current_batch_run += 1
             
             if debug_mode:
                 if not is_completed:
-                    print(f"   ✅ 当前批次处理完成，下一批次将使用: {state['current_batch_run']}")
+                    print(f"   ✅ 当前批次处理完成，下一批次将使用: {state.current_batch_run}")
                 else:
                     print(f"   ⚠️ 已达到总数上限，停止自增")
             
@@ -228,25 +250,27 @@ class buding_BatchIndexStepper:
             result = (0, f"错误: {error_msg}", history_info)
             return {"result": result, "ui": {}}
     
-    def _generate_history_info(self, state: Dict, calculated_index: int, max_files_per_batch: int, total_count: int, debug_mode: bool = False) -> str:
-        """生成增强的历史统计信息"""
+    def _generate_history_info(self, state: _StepperState, calculated_index: int, max_files_per_batch: int, total_count: int,
+                               debug_mode: bool = False, task_start_str: str = None) -> str:
+        """生成增强的历史统计信息（task_start_str 为调用方已格式化好的开始时间，None 时自行格式化）"""
         # 格式化重置时间
-        reset_time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(state['last_reset_time']))
+        reset_time_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(state.last_reset_time))
         
         # 格式化任务开始时间
-        task_start_str = "未开始"
-        if state['task_start_time'] is not None:
-            task_start_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(state['task_start_time']))
+        if task_start_str is None:
+            task_start_str = "未开始"
+            if state.task_start_time is not None:
+                task_start_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(state.task_start_time))
         
         # 计算已处理文件数
-        processed_files = min(calculated_index + max_files_per_batch, total_count) if total_count > 0 else state['total_processed_batches'] * max_files_per_batch
+        processed_files = min(calculated_index + max_files_per_batch, total_count) if total_count > 0 else state.total_processed_batches * max_files_per_batch
         remaining_files = max(0, total_count - processed_files) if total_count > 0 else 0
         
         history = (f"📊 历史统计:\n"
-                  f"   累计处理批次: {state['total_processed_batches']}\n"
+                  f"   累计处理批次: {state.total_processed_batches}\n"
                   f"   已处理文件: {processed_files}{f'/{total_count}' if total_count > 0 else ''}\n"
                   f"   剩余文件: {remaining_files}\n"
-                  f"   总计跳过文件: {state['total_skipped_files']}\n"
+                  f"   总计跳过文件: {state.total_skipped_files}\n"
                   f"   本次任务开始时间: {task_start_str}\n"
                   f"   上次重置时间: {reset_time_str}")
         
@@ -257,20 +281,14 @@ class buding_BatchIndexStepper:
         if total_count <= 0:
             return "可视化进度条：░░░░░░░░░░░░░░░░ 0%"
         
-        # 计算当前已处理的文件数（不超过总数）
-        processed_count = min(calculated_index + max_files_per_batch, total_count)
-        
-        # 计算进度百分比
-        progress = processed_count / total_count
-        progress = max(0.0, min(1.0, progress))
+        # 计算当前已处理的文件数（0 到总数之间）
+        processed_count = max(0, min(calculated_index + max_files_per_batch, total_count))
         
-        # 生成进度条
-        bar_length = 20
-        filled_length = int(bar_length * progress)
-        empty_length = bar_length - filled_length
+        # 取预生成的进度条（填充格数用整数运算，避免浮点误差）
+        filled_length = processed_count * _BAR_LENGTH // total_count
         
-        progress_bar = "█" * filled_length + "░" * empty_length
-        percentage = f"{progress:.0%}"
+        progress_bar = _BARS[filled_length]
+        percentage = f"{processed_count / total_count:.0%}"
         
         return f"可视化进度条：{progress_bar} {percentage}"
     
@@ -278,6 +296,7 @@ class buding_BatchIndexStepper:
     def reset_all_counters(cls):
         """✅ 重置所有实例的计数器（类方法，可以从外部调用）"""
         cls._instances_state.clear()
+        cls._global_processed_batches = 0
         print("🔄 所有批量索引步进器实例的计数器已重置（包括历史统计）")
     
     @classmethod
@@ -287,14 +306,15 @@ class buding_BatchIndexStepper:
         total_skipped = 0
         
         for state in cls._instances_state.values():
-            total_batches += state.get('total_processed_batches', 0)
-            total_skipped += state.get('total_skipped_files', 0)
+            total_batches += state.total_processed_batches
+            total_skipped += state.total_skipped_files
         
         return {
             "num_instances": len(cls._instances_state),
             "total_processed_batches": total_batches,
             "total_skipped_files": total_skipped,
-            "all_instances_state": cls._instances_state  # ← 返回所有实例的详细状态
+            # ← 返回所有实例的详细状态（导出为字典，保持原有输出格式）
+            "all_instances_state": {instance_id: state.as_dict() for instance_id, state in cls._instances_state.items()}
         }
 
 # 注册节点
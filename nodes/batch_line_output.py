@@ -7,14 +7,64 @@ buding_行文本输出增强版 - 支持关键词筛选、单行/多行模式、
 """
 
 import random
-from typing import Tuple, List
+import re
+from functools import lru_cache
+from typing import Tuple, Sequence
 
 
 def _normalize_newlines(value: str) -> str:
-    """统一换行符为 \\n"""
+    """统一换行符为 \\n（不含 \\r 时直接返回原字符串，省去两次全文扫描替换）"""
+    if "\r" not in value:
+        return value
     return value.replace("\r\n", "\n").replace("\r", "\n")
 
 
+@lru_cache(maxsize=32)
+def _compile_keyword_pattern(keyword_filter: str, mode: str):
+    """
+    把关键词编译为单个正则，返回逐行调用的匹配函数；没有有效关键词时返回 None
+    AND 模式：从行首开始的先行断言 (?=.*kw1)(?=.*kw2)...，必须用 match 锚定行首，search 会逐位置重试
+    OR 模式：关键词交替 kw1|kw2|...，用 search
+    """
+    # 分割关键词
+    keywords = [kw.strip() for kw in keyword_filter.split("、") if kw.strip()]
+    
+    if not keywords:
+        return None
+    
+    if mode == "AND":
+        # AND 模式：所有关键词都必须出现
+        return re.compile("".join(f"(?=.*{re.escape(kw)})" for kw in keywords), re.DOTALL).match
+    # OR 模式：任意关键词出现即可
+    return re.compile("|".join(re.escape(kw) for kw in keywords)).search
+
+
+def _filter_by_keywords(lines: Sequence[str], keyword_filter: str, mode: str) -> Tuple[str, ...]:
+    """
+    按关键词筛选行
+    """
+    if not keyword_filter:
+        return tuple(lines)
+    
+    matcher = _compile_keyword_pattern(keyword_filter, mode)
+    
+    if matcher is None:
+        return tuple(lines)
+    
+    return tuple(line for line in lines if matcher(line))
+
+
+@lru_cache(maxsize=32)
+def _split_and_filter(file_text: str, keyword_filter: str, mode: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    标准化换行、移除空行并按关键词筛选，返回 (全部非空行, 筛选后的行)
+    批量工作流中同一文本和筛选条件会被反复调用，按输入缓存结果（元组不可变，可安全共享）
+    """
+    # 空白行判断用 isspace()，不像 strip() 那样为每一行分配新字符串
+    all_lines = tuple(line for line in _normalize_newlines(file_text).split('\n') if line and not line.isspace())
+    return all_lines, _filter_by_keywords(all_lines, keyword_filter, mode)
+
+
 class buding_行文本输出增强版:
     """
     行文本输出增强版节点：支持多关键词筛选、单行/多行模式、随机种子
@@ -96,21 +146,17 @@ class buding_行文本输出增强版:
         else:
             used_seed = seed
         
-        random.seed(used_seed)
-        
-        # 标准化换行符
-        file_text = _normalize_newlines(file_text)
+        # 使用独立的随机数生成器，不改动全局 random 的状态（其他节点/线程不受影响）
+        rng = random.Random(used_seed)
         
-        # 读取所有行并移除空行
-        all_lines = [line for line in file_text.split('\n') if line.strip()]
+        # 标准化换行符、移除空行并按关键词筛选（相同输入直接复用缓存结果）
+        all_lines, filtered_lines = _split_and_filter(file_text, keyword_filter, keyword_filter_mode)
         total_lines = len(all_lines)
         
         if total_lines == 0:
             log = "统计日志：文本为空或全为空行\n扫描行数: 0\n输出行数: 0"
             return "", log
         
-        # 第一步：按关键词筛选
-        filtered_lines = self._filter_by_keywords(all_lines, keyword_filter, keyword_filter_mode)
         filtered_count = len(filtered_lines)
         
         if filtered_count == 0:
@@ -125,47 +171,21 @@ class buding_行文本输出增强版:
         
         # 单行模式
         if output_mode == "单行输出":
-            return self._single_line_mode(filtered_lines, total_lines, filtered_count, randomize)
+            return self._single_line_mode(filtered_lines, total_lines, filtered_count, randomize, rng)
         
         # 多行模式
         else:
             return self._multi_line_mode(filtered_lines, start_line, max_lines, 
-                                        fallback_to_all, total_lines, filtered_count, randomize)
-    
-    def _filter_by_keywords(self, lines: List[str], keyword_filter: str, mode: str) -> List[str]:
-        """
-        按关键词筛选行
-        """
-        if not keyword_filter:
-            return lines
-        
-        # 分割关键词
-        keywords = [kw.strip() for kw in keyword_filter.split("、") if kw.strip()]
-        
-        if not keywords:
-            return lines
-        
-        filtered = []
-        for line in lines:
-            if mode == "AND":
-                # AND 模式：所有关键词都必须出现
-                if all(kw in line for kw in keywords):
-                    filtered.append(line)
-            else:  # OR
-                # OR 模式：任意关键词出现即可
-                if any(kw in line for kw in keywords):
-                    filtered.append(line)
-        
-        return filtered
+                                        fallback_to_all, total_lines, filtered_count, randomize, rng)
     
-    def _single_line_mode(self, filtered_lines: List[str], total_lines: int, 
-                         filtered_count: int, randomize: bool) -> Tuple[str, str]:
+    def _single_line_mode(self, filtered_lines: Sequence[str], total_lines: int, 
+                         filtered_count: int, randomize: bool, rng: random.Random) -> Tuple[str, str]:
         """
         单行模式：返回一行文本
         """
         if randomize:
             # 随机模式：从筛选行中随机选一行
-            selected_line = random.choice(filtered_lines)
+            selected_line = rng.choice(filtered_lines)
         else:
             # 顺序模式：返回第一行
             selected_line = filtered_lines[0]
@@ -181,9 +201,9 @@ class buding_行文本输出增强版:
         
         return selected_line, log
     
-    def _multi_line_mode(self, filtered_lines: List[str], start_line: int, max_lines: int,
+    def _multi_line_mode(self, filtered_lines: Sequence[str], start_line: int, max_lines: int,
                          fallback_to_all: bool, total_lines: int, filtered_count: int,
-                         randomize: bool) -> Tuple[str, str]:
+                         randomize: bool, rng: random.Random) -> Tuple[str, str]:
         """
         多行模式：按范围提取行
         """
@@ -223,7 +243,7 @@ class buding_行文本输出增强版:
             # 随机模式：从范围内随机选择行
             select_count = min(max_lines if max_lines > 0 else range_count, len(range_lines))
             if select_count > 0:
-                selected_lines = random.sample(range_lines, min(select_count, len(range_lines)))
+                selected_lines = rng.sample(range_lines, min(select_count, len(range_lines)))
             else:
                 selected_lines = []
         else:
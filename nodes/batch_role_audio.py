@@ -1,13 +1,148 @@
 import os
 import re
+import json
+import hashlib
 import random
-import torch
+import struct
+import threading
 import numpy as np
 import subprocess
-import tempfile
 import wave
 import time
-from pathlib import Path
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# 预编译的正则表达式（角色配置解析、日志表格对齐）
+_ROLE_LINE_RE = re.compile(r'\[s\d+\][^\[]*')          # 一行中的每个 [sX] 角色片段
+_ROLE_PARSE_RE = re.compile(r'(\[s\d+\])[\s=:-]*(.*)')  # [sX] 角色名 / [sX]=角色名 / [sX]:角色名
+_TRAIL_SEP_RE = re.compile(r'[、,，]+$')                # 角色名尾部的分隔符
+_TAG_RE = re.compile(r'\[s\d+\]')                     # 文本中出现的 [sX] 标签
+_CJK_RE = re.compile(r'[\u4e00-\u9fff]')              # 中文字符（表格中占两个字符宽度）
+
+# ffprobe / FFmpeg 并行子进程数上限（子进程为 IO/进程绑定，线程池即可并行）
+_SUBPROCESS_MAX_WORKERS = 8
+
+
+def _wav_duration(path):
+    """
+    直接解析 WAV 头（RIFF/fmt/data 块）计算时长（秒），不启动 ffprobe
+    解析失败（非 RIFF/WAVE、缺少 fmt 或 data 块）时返回 None，由调用方回退到 ffprobe
+    """
+    try:
+        with open(path, 'rb') as fp:
+            header = fp.read(12)
+            if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+                return None
+
+            byte_rate = 0
+            while True:
+                chunk = fp.read(8)
+                if len(chunk) < 8:
+                    return None
+                chunk_id, chunk_size = struct.unpack('<4sI', chunk)
+                padded_size = chunk_size + (chunk_size & 1)  # RIFF 块按偶数字节对齐
+
+                if chunk_id == b'fmt ':
+                    fmt = fp.read(16)
+                    if len(fmt) < 16:
+                        return None
+                    byte_rate = struct.unpack_from('<I', fmt, 8)[0]
+                    fp.seek(padded_size - 16, os.SEEK_CUR)
+                elif chunk_id == b'data':
+                    if not byte_rate:
+                        return None
+                    # 数据块长度以实际文件大小为上限（截断文件、流式写入的 0xFFFFFFFF 长度）
+                    data_size = min(chunk_size, os.fstat(fp.fileno()).st_size - fp.tell())
+                    return data_size / byte_rate
+                else:
+                    fp.seek(padded_size, os.SEEK_CUR)
+    except (OSError, struct.error):
+        return None
+
+
+def _ffprobe_duration(path):
+    """使用 ffprobe 获取音频时长（秒），失败时抛出异常"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+         '-of', 'csv=p=0', path],
+        capture_output=True, text=True, timeout=5
+    )
+    return float(result.stdout.strip())
+
+
+def _read_wav_direct(path, sr, max_d):
+    """
+    直接读取已是目标格式（16 位 PCM、单声道、采样率为 sr）的 WAV，返回 int16 转换后的 float32 数组
+    格式不符、时长超过 max_d（需要截断）或无法解析时返回 None，由调用方回退到 FFmpeg
+    """
+    try:
+        with wave.open(path, 'rb') as wf:
+            if wf.getframerate() != sr or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+                return None
+            n_frames = wf.getnframes()
+            if max_d > 0 and n_frames / sr > max_d:
+                return None
+            raw = wf.readframes(n_frames)
+    except (wave.Error, EOFError, OSError):
+        return None
+    return np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+
+
+def _scandir_recursive(path, depth, exts):
+    """
+    基于 os.scandir 的递归扫描（替代 os.walk）
+    depth 为剩余可下探层数，直接用 DirEntry 缓存的类型信息判断文件/目录
+    产出顺序与 os.walk 自顶向下一致：先当前目录的文件，再依次进入子目录
+    产出 (路径, 小写文件名, 小写文件名去扩展名, mtime_ns, 文件大小)：
+    文件名预先规范化供匹配使用；stat 信息取自 DirEntry（Windows 上随目录枚举免费返回），
+    时长过滤直接用它查时长缓存，无需再逐个 os.stat
+    """
+    subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if depth > 0:
+                            subdirs.append(entry.path)
+                    elif entry.is_file():
+                        name_lower = entry.name.lower()
+                        stem_lower, ext = os.path.splitext(name_lower)
+                        if ext in exts:
+                            st = entry.stat()
+                            yield entry.path, name_lower, stem_lower, st.st_mtime_ns, st.st_size
+                except OSError:
+                    continue
+    except (PermissionError, FileNotFoundError, NotADirectoryError):
+        # 扫描期间目录被删除或无权限访问时跳过（与 os.walk 的默认行为一致）
+        return
+
+    for sub in subdirs:
+        yield from _scandir_recursive(sub, depth - 1, exts)
+
+
+class _AudioLibrary:
+    """
+    一次扫描得到的音频库索引（构建后只读，随扫描结果一起缓存）
+    - entries：扫描条目列表，保持扫描顺序
+    - by_stem：小写文件名去扩展名 -> 条目列表，精确匹配直接查表
+    - sorted_stems / sorted_positions：排序后的 stem 及其在 entries 中的下标，
+      前缀匹配用二分查找定位连续区间
+    """
+
+    __slots__ = ('entries', 'by_stem', 'sorted_stems', 'sorted_positions')
+
+    def __init__(self, entries=()):
+        self.entries = list(entries)
+        self.by_stem = {}
+        for entry in self.entries:
+            self.by_stem.setdefault(entry[2], []).append(entry)
+        self.sorted_positions = sorted(range(len(self.entries)), key=lambda i: self.entries[i][2])
+        self.sorted_stems = [self.entries[i][2] for i in self.sorted_positions]
+
+    def __len__(self):
+        return len(self.entries)
 
 
 class buding_BatchRoleAudio:
@@ -26,9 +161,21 @@ class buding_BatchRoleAudio:
     - IS_CHANGED()方法：正确通知ComfyUI何时需要重新执行
     """
     
-    _path_cache = {}
+    # 扫描结果缓存（LRU，有容量上限）：键为 "库路径_深度"
+    _path_cache = OrderedDict()
     _cache_timestamp = 0
     _cache_ttl = 30
+    PATH_CACHE_MAX_ENTRIES = 8
+    # 音频时长缓存（LRU，有容量上限）：键为 (路径, mtime_ns, 文件大小)，文件被修改后键自然失效，无需 TTL
+    _duration_cache = OrderedDict()
+    DURATION_CACHE_MAX_ENTRIES = 100000
+
+    # 静音张量缓存：采样率 -> 100ms 全零张量（只读共享，各槽位复用同一个）
+    _silence_cache = {}
+
+    # 子进程线程池（ffprobe / FFmpeg）在所有调用间共享，首次使用时创建
+    _executor = None
+    _executor_lock = threading.Lock()
 
     def __init__(self):
         pass
@@ -126,7 +273,7 @@ class buding_BatchRoleAudio:
         if always_reload:
             return float("nan")  # 强制重新加载，返回 NaN 让 ComfyUI 总是执行
         
-        # 使用 frozenset 哈希所有影响输出的参数
+        # 哈希所有影响输出的参数（包括 optional 中的音频处理参数）
         key_params = {
             'segment_text': segment_text,
             'library_root': library_root,
@@ -136,8 +283,13 @@ class buding_BatchRoleAudio:
             'random_selection': random_selection,
             'seed': seed,
             'roles_config': roles_config,
+            'target_sample_rate': kwargs.get('target_sample_rate', 44100),
+            'volume_normalization': kwargs.get('volume_normalization', True),
+            'max_duration_seconds': kwargs.get('max_duration_seconds', 30.0),
+            'fade_ms': kwargs.get('fade_ms', 10),
         }
-        return hash(frozenset(key_params.items()))
+        # 使用稳定的内容摘要，不受 Python 进程级哈希随机化影响
+        return hashlib.blake2b(json.dumps(key_params, sort_keys=True).encode('utf-8')).hexdigest()
 
     def process_batch_roles(self, **kwargs):
         """
@@ -173,8 +325,16 @@ class buding_BatchRoleAudio:
             for i, (tag, name) in enumerate(roles_list, 1):
                 print(f"[DEBUG]   角色{i}: {tag} -> {name}")
 
-        # 扫描库路径（使用 TTL 缓存）
-        all_audio_files = self._quick_scan(library_root, kwargs.get("scan_max_depth", 3), debug_mode)
+        # 文本中实际出现的标签只提取一次，各角色用集合查找代替逐个子串搜索
+        present_tags = frozenset(_TAG_RE.findall(segment_text))
+
+        # 扫描库路径（使用 TTL 缓存）；没有任何角色的标签出现在文本中时无需扫描
+        if any(tag in present_tags for tag, _ in roles_list[:20]):
+            all_audio_files = self._quick_scan(library_root, kwargs.get("scan_max_depth", 3), debug_mode)
+        else:
+            all_audio_files = _AudioLibrary()
+            if debug_mode:
+                print("[DEBUG] 文本中没有已配置角色的标签，跳过音频库扫描")
 
         if debug_mode:
             print(f"[DEBUG] 库路径: {library_root}")
@@ -184,12 +344,11 @@ class buding_BatchRoleAudio:
         log_data = []
         total_duration = 0.0
 
-        # 循环处理 20 个槽位（不足的用静音补充）
+        # 第1遍：依次处理 20 个槽位的匹配、过滤和选择（不足的用静音补充）
+        # 随机选择按槽位顺序串行进行，保证相同种子得到相同的选择结果
         for i in range(1, 21):
-            audio_out = None
             status = "⚪ 跳过"
             hit_path = "-"
-            dur = 0.0
             candidates = []
             selected_file = None
             role_cfg = ""
@@ -202,7 +361,7 @@ class buding_BatchRoleAudio:
                 if debug_mode:
                     print(f"[DEBUG] 角色 {i}: 标签={tag}, 名称={name}")
 
-                if tag in segment_text and name:
+                if tag in present_tags and name:
                     # 第1步：匹配文件
                     matched_files = self._find_files(name, all_audio_files, kwargs)
 
@@ -224,46 +383,58 @@ class buding_BatchRoleAudio:
                             # 真正随机选择（不使用种子）
                             selected_file = random.choice(valid_files)
                         else:
-                            # 用种子固定选择
-                            random.seed(seed + i)
-                            selected_file = random.choice(valid_files)
+                            # 用种子固定选择（局部随机数生成器，不改动全局 random 状态）
+                            selected_file = random.Random(seed + i).choice(valid_files)
 
                         if debug_mode:
                             print(f"[DEBUG] 角色 {i}({name}): 选中 {os.path.basename(selected_file)}")
-
-                        # 第4步：加载音频
-                        audio_out, dur = self._load_audio_ffmpeg(selected_file, kwargs)
-                        if audio_out:
-                            status = "✅ 成功"
-                            hit_path = os.path.basename(selected_file)
-                            total_duration += dur
-                        else:
-                            status = "❌ 损坏"
-                            hit_path = f"加载失败：{os.path.basename(selected_file)}"
                     else:
                         # 匹配到但都过滤掉了
                         status = "⚠️ 过短"
                         hit_path = f"找到 {len(matched_files)} 个，但都 <{min_dur}s"
                 else:
-                    if tag not in segment_text:
+                    if tag not in present_tags:
                         status = "⚪ 跳过"
                         hit_path = f"文本中无 {tag} 标签"
 
-            # 智能防错：无匹配时输出静音
-            if audio_out is None:
-                audio_out = self._create_silent(kwargs.get("target_sample_rate", 44100))
-
-            results_audio.append(audio_out)
             log_data.append({
                 "id": i,
                 "name": role_cfg,
                 "status": status,
-                "dur": dur,
+                "dur": 0.0,
                 "path": hit_path,
                 "candidates": candidates[:5],  # 最多显示5个候选
                 "selected": selected_file
             })
 
+        # 第2遍（第4步：加载音频）：选中的文件提交到线程池并行加载（等待 FFmpeg 子进程时不占用 GIL）
+        executor = self._get_executor()
+        futures = [
+            executor.submit(self._load_audio_ffmpeg, d["selected"], kwargs) if d["selected"] else None
+            for d in log_data
+        ]
+
+        # 第3遍：按槽位顺序收集结果，保证输出顺序与时长累加顺序不变
+        for d, future in zip(log_data, futures):
+            audio_out = None
+            if future is not None:
+                selected_file = d["selected"]
+                audio_out, dur = future.result()
+                if audio_out:
+                    d["status"] = "✅ 成功"
+                    d["path"] = os.path.basename(selected_file)
+                    d["dur"] = dur
+                    total_duration += dur
+                else:
+                    d["status"] = "❌ 损坏"
+                    d["path"] = f"加载失败：{os.path.basename(selected_file)}"
+
+            # 智能防错：无匹配时输出静音
+            if audio_out is None:
+                audio_out = self._create_silent(kwargs.get("target_sample_rate", 44100))
+
+            results_audio.append(audio_out)
+
         # 生成增强日志表格
         log_report = self._generate_enhanced_log(log_data, total_duration, seed, kwargs)
 
@@ -301,19 +472,18 @@ class buding_BatchRoleAudio:
             
             # 首先尝试分割一行中的多个角色（用顿号、逗号分隔）
             # 查找所有 [sX] 模式
-            role_pattern = r'\[s\d+\][^\[]*'
-            matches = re.findall(role_pattern, line)
+            matches = _ROLE_LINE_RE.findall(line)
             
             if matches:
                 # 一行中有多个角色
                 for match_str in matches:
                     # 解析每个角色：[sX] 角色名 或 [sX]=角色名 或 [sX]:角色名
-                    role_match = re.match(r"(\[s\d+\])[\s=:-]*(.*)", match_str.strip())
+                    role_match = _ROLE_PARSE_RE.match(match_str.strip())
                     if role_match:
                         tag = role_match.group(1)
                         name = role_match.group(2).strip()
                         # 移除尾部的分隔符（顿号、逗号等）
-                        name = re.sub(r'[、,，]+$', '', name).strip()
+                        name = _TRAIL_SEP_RE.sub('', name).strip()
                         
                         if name:  # 只有当名字非空时才添加
                             roles_list.append((tag, name))
@@ -331,45 +501,39 @@ class buding_BatchRoleAudio:
         """
         快速扫描音频库，带 TTL 缓存
         缓存在 30 秒后自动过期
+        返回 _AudioLibrary，条目为 (路径, 小写文件名, 小写文件名去扩展名, mtime_ns, 文件大小)
         """
         now = time.time()
         key = f"{root}_{depth}"
         
         # 检查缓存是否存在且未过期
-        if key in self._path_cache:
+        cached = self._cache_get(self._path_cache, key)
+        if cached is not None:
             cache_age = now - self._cache_timestamp
             if cache_age < self._cache_ttl:
                 if debug_mode:
                     print(f"[DEBUG] 使用缓存的文件列表（年龄: {cache_age:.1f}s）")
-                return self._path_cache[key]
+                return cached
             else:
                 if debug_mode:
                     print(f"[DEBUG] 缓存已过期（年龄: {cache_age:.1f}s > TTL: {self._cache_ttl}s），重新扫描")
 
         # 缓存未命中或已过期，执行扫描
         exts = {'.wav', '.mp3', '.flac', '.m4a', '.ogg', '.aac', '.wma'}
-        found = []
         if not os.path.exists(root):
             if debug_mode:
                 print(f"[DEBUG] 库路径不存在: {root}")
-            return found
+            return _AudioLibrary()
 
         try:
-            for r, d, files in os.walk(root):
-                curr_depth = len(Path(r).relative_to(Path(root)).parts)
-                if curr_depth > depth:
-                    d[:] = []
-                    continue
-                for f in files:
-                    if os.path.splitext(f)[1].lower() in exts:
-                        found.append(os.path.join(r, f))
+            found = _AudioLibrary(_scandir_recursive(root, depth, exts))
         except Exception as e:
             if debug_mode:
                 print(f"[ERROR] 扫描库路径失败: {e}")
-            return []
+            return _AudioLibrary()
 
         # 更新缓存
-        self._path_cache[key] = found
+        self._cache_put(self._path_cache, key, found, self.PATH_CACHE_MAX_ENTRIES)
         self._cache_timestamp = now
         
         if debug_mode:
@@ -381,108 +545,133 @@ class buding_BatchRoleAudio:
         """
         根据角色名称查找匹配的音频文件
         支持三种匹配模式：精确匹配、前缀匹配、包含匹配
+        files 为 _quick_scan 返回的 _AudioLibrary，文件名已在扫描时转为小写
+        返回匹配到的扫描条目（保持扫描顺序）
         """
         mode = kwargs.get("match_mode", "包含匹配")
         name = name.lower()
-        res = []
-
-        for f in files:
-            fn = os.path.basename(f).lower()
-            fn_noext = os.path.splitext(fn)[0]
 
-            matched = False
-
-            if mode == "精确匹配":
-                # 精确匹配：文件名（去扩展名）完全相同
-                if name == fn_noext:
-                    matched = True
-            elif mode == "前缀匹配":
-                # 前缀匹配：文件名以角色名开头（最严格）
-                if fn_noext.startswith(name):
-                    matched = True
-            else:  # 包含匹配（默认）
-                # 包含匹配：文件名包含角色名（最宽松）
-                if name in fn:
-                    matched = True
-
-            if matched:
-                res.append(f)
-
-        return res
+        if mode == "精确匹配":
+            # 精确匹配：文件名（去扩展名）完全相同，直接查表
+            return list(files.by_stem.get(name, ()))
+        elif mode == "前缀匹配":
+            # 前缀匹配：文件名以角色名开头（最严格）
+            # 以 name 开头的 stem 在排序后连续排列，二分定位起点后向后扫描到不匹配为止
+            stems = files.sorted_stems
+            start = end = bisect_left(stems, name)
+            while end < len(stems) and stems[end].startswith(name):
+                end += 1
+            return [files.entries[i] for i in sorted(files.sorted_positions[start:end])]
+        else:  # 包含匹配（默认）
+            # 包含匹配：文件名包含角色名（最宽松），子串无法建索引，仍线性扫描
+            return [entry for entry in files.entries if name in entry[1]]
 
     def _filter_by_duration(self, files, min_duration, debug_mode=False):
         """
         按最小时长过滤文件
         避免加载太短的音频（无法提供有效的TTS参考）
+        files 为 _find_files 返回的扫描条目，直接使用扫描时记录的 stat 信息；返回文件路径列表
         """
         if min_duration <= 0:
-            return files
+            return [entry[0] for entry in files]
+
+        # 第1遍：查缓存，WAV 直接解析文件头；其余文件留给 ffprobe
+        durations = {}
+        to_probe = []
+        for f, name_lower, _, mtime_ns, size in files:
+            cache_key = (f, mtime_ns, size)
+            duration = self._cache_get(self._duration_cache, cache_key)
+            if duration is None and name_lower.endswith('.wav'):
+                duration = _wav_duration(f)
+                if duration is not None:
+                    self._cache_put(self._duration_cache, cache_key, duration, self.DURATION_CACHE_MAX_ENTRIES)
+
+            if duration is None:
+                to_probe.append((f, cache_key))
+            else:
+                durations[f] = duration
+
+        # 第2遍：缓存未命中的非 WAV 文件并行调用 ffprobe
+        if to_probe:
+            executor = self._get_executor()
+            futures = [(f, cache_key, executor.submit(_ffprobe_duration, f)) for f, cache_key in to_probe]
+            for f, cache_key, future in futures:
+                try:
+                    duration = future.result()
+                except Exception as e:
+                    if debug_mode:
+                        print(f"[DEBUG] 检测音频时长失败 {os.path.basename(f)}: {e}")
+                    continue
+                self._cache_put(self._duration_cache, cache_key, duration, self.DURATION_CACHE_MAX_ENTRIES)
+                durations[f] = duration
 
         valid = []
-        for f in files:
-            try:
-                # 使用 ffprobe 快速获取时长
-                result = subprocess.run(
-                    ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-                     '-of', 'csv=p=0', f],
-                    capture_output=True, text=True, timeout=5
-                )
-                duration = float(result.stdout.strip())
-                
-                if duration >= min_duration:
-                    valid.append(f)
-                elif debug_mode:
-                    print(f"[DEBUG] 过滤掉短音频: {os.path.basename(f)} ({duration:.2f}s < {min_duration}s)")
-            except Exception as e:
-                if debug_mode:
-                    print(f"[DEBUG] 检测音频时长失败 {os.path.basename(f)}: {e}")
+        for entry in files:
+            f = entry[0]
+            duration = durations.get(f)
+            if duration is None:
                 # 检测失败时保守处理：包含这个文件
                 valid.append(f)
+            elif duration >= min_duration:
+                valid.append(f)
+            elif debug_mode:
+                print(f"[DEBUG] 过滤掉短音频: {os.path.basename(f)} ({duration:.2f}s < {min_duration}s)")
 
         return valid
 
+    @staticmethod
+    def _cache_get(store, key):
+        """读取LRU缓存，命中时移到末尾"""
+        value = store.get(key)
+        if value is not None:
+            store.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _cache_put(store, key, value, max_entries):
+        """写入LRU缓存，超出容量时淘汰最久未使用的条目"""
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > max_entries:
+            store.popitem(last=False)
+
+    @classmethod
+    def _get_executor(cls):
+        """获取共享的子进程线程池（ffprobe 时长检测、FFmpeg 解码）"""
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=_SUBPROCESS_MAX_WORKERS,
+                                                   thread_name_prefix="buding_role_audio")
+            return cls._executor
+
     def _load_audio_ffmpeg(self, path, kwargs):
         """使用 FFmpeg 加载并处理音频"""
         sr = kwargs.get("target_sample_rate", 44100)
         max_d = kwargs.get("max_duration_seconds", 30.0)
         fade_ms = kwargs.get("fade_ms", 10)
 
-        tmp_p = None
         try:
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
-                tmp_p = tmp.name
-
-            # 构建 FFmpeg 命令
-            cmd = ['ffmpeg', '-y', '-i', path]
-
-            if max_d > 0:
-                cmd.extend(['-t', str(max_d)])
-
-            if fade_ms > 0:
-                f = fade_ms / 1000.0
-                fade_out_start = max(0, max_d - f) if max_d > 0 else 1
-                cmd.extend([
-                    '-af',
-                    f'afade=t=in:st=0:d={f},afade=t=out:st={fade_out_start}:d={f}'
-                ])
-
-            cmd.extend(['-ar', str(sr), '-ac', '1', '-f', 'wav', tmp_p])
-
-            # 执行 FFmpeg
-            subprocess.run(cmd, capture_output=True, check=True, timeout=15)
-
-            # 读取转换后的 WAV 文件
-            with wave.open(tmp_p, 'rb') as wf:
-                audio_np = np.frombuffer(wf.readframes(-1), dtype=np.int16).astype(np.float32) / 32768.0
+            # 快速路径：已是目标格式的 WAV 且无需截断、淡入淡出时直接读取，不启动 FFmpeg
+            audio_np = None
+            if fade_ms <= 0 and path.lower().endswith('.wav'):
+                audio_np = _read_wav_direct(path, sr, max_d)
+            if audio_np is None:
+                audio_np = self._decode_ffmpeg(path, sr, max_d, fade_ms)
+            audio_np *= (1.0 / 32768.0)  # 原地缩放到 [-1, 1)，不再产生临时数组
 
             # 音量标准化：峰值归一化到 0.95
             if kwargs.get("volume_normalization", True) and len(audio_np) > 0:
-                peak = np.max(np.abs(audio_np))
+                # 峰值 = max(|min|, |max|)，避免 np.abs 额外分配整段数组
+                peak = max(-float(audio_np.min()), float(audio_np.max()))
                 if peak > 0:
                     audio_np *= (0.95 / peak)
 
-            # 转换为 ComfyUI 格式
-            audio_tensor = torch.from_numpy(audio_np).unsqueeze(0).unsqueeze(0)
+            # torch 仅在生成张量时才需要，延迟到此处导入（模块加载时不引入 torch）
+            import torch
+
+            # 转换为 ComfyUI 格式 [batch, channels, samples]
+            # audio_np 由 astype 新建，必然连续，from_numpy 与之共享内存，view 一次完成变形
+            audio_tensor = torch.from_numpy(audio_np).view(1, 1, -1)
             return {
                 "waveform": audio_tensor,
                 "sample_rate": sr
@@ -492,19 +681,44 @@ class buding_BatchRoleAudio:
             print(f"[ERROR] 加载音频失败 {path}: {e}")
             return None, 0
 
-        finally:
-            # 清理临时文件
-            if tmp_p and os.path.exists(tmp_p):
-                try:
-                    os.unlink(tmp_p)
-                except:
-                    pass
+    def _decode_ffmpeg(self, path, sr, max_d, fade_ms):
+        """使用 FFmpeg 解码为单声道 16 位 PCM，返回 float32 数组（未缩放）"""
+        # 构建 FFmpeg 命令
+        # -threads 1：多个 FFmpeg 已在线程池中并行，避免每个进程再各自开一组解码线程
+        cmd = ['ffmpeg', '-y', '-threads', '1', '-i', path]
+
+        if max_d > 0:
+            cmd.extend(['-t', str(max_d)])
+
+        if fade_ms > 0:
+            f = fade_ms / 1000.0
+            fade_out_start = max(0, max_d - f) if max_d > 0 else 1
+            cmd.extend([
+                '-af',
+                f'afade=t=in:st=0:d={f},afade=t=out:st={fade_out_start}:d={f}'
+            ])
+
+        # 直接输出 16 位单声道裸 PCM 到标准输出，不经过临时文件
+        cmd.extend(['-ar', str(sr), '-ac', '1', '-f', 's16le', '-acodec', 'pcm_s16le', 'pipe:1'])
+
+        # 执行 FFmpeg（超时随截取时长放宽；不截取时需解码整个文件，给更宽裕的上限）
+        timeout = max(15, int(max_d * 2)) if max_d > 0 else 60
+        proc = subprocess.run(cmd, capture_output=True, check=True, timeout=timeout)
+
+        return np.frombuffer(proc.stdout, dtype=np.int16).astype(np.float32)
 
     def _create_silent(self, sr):
-        """创建 100ms 静音张量（防错机制）"""
-        samples = int(sr * 0.1)
+        """创建 100ms 静音音频（防错机制），同一采样率复用缓存的全零张量"""
+        waveform = self._silence_cache.get(sr)
+        if waveform is None:
+            import torch
+
+            samples = int(sr * 0.1)
+            waveform = torch.zeros(1, 1, samples)
+            self._silence_cache[sr] = waveform
+        # 每次返回新的字典，仅共享只读的张量
         return {
-            "waveform": torch.zeros(1, 1, samples),
+            "waveform": waveform,
             "sample_rate": sr
         }
 
@@ -526,7 +740,7 @@ class buding_BatchRoleAudio:
         """解决中英文混排对齐的硬核函数"""
         stext = str(text)
         # 计算中文字符数量
-        count = len(re.findall(r'[\u4e00-\u9fff]', stext))
+        count = len(_CJK_RE.findall(stext))
         # 实际占用宽度 = 字符长度 + 中文额外占位
         return stext.ljust(width - count)
 
@@ -539,37 +753,34 @@ class buding_BatchRoleAudio:
         3. 强制列宽，使用 ljust 对齐
         4. 文件名用"前3---后3"缩减，路径用末尾3层
         """
-        log = "=" * 90 + "\n"
-        log += "🎭 批量角色音频加载报告 [种子: %d]\n" % seed
-        log += "=" * 90 + "\n\n"
+        # 各段文本先收集到列表，最后一次性 join
+        parts = ["=" * 90 + "\n"]
+        parts.append(f"🎭 批量角色音频加载报告 [种子: {seed}]\n")
+        parts.append("=" * 90 + "\n\n")
 
         # 基础配置行
         min_dur = kwargs.get("min_duration_seconds", 0.5)
         random_sel = kwargs.get("random_selection", False)
         match_mode = kwargs.get("match_mode", "包含匹配")
-        log += "配置: 模式=%s | 随机选择=%s | 最小时长=%.1fs\n\n" % (
-            match_mode, 
-            "ON" if random_sel else "OFF",
-            min_dur
-        )
+        parts.append(f"配置: 模式={match_mode} | 随机选择={'ON' if random_sel else 'OFF'} | 最小时长={min_dur:.1f}s\n\n")
 
         # 表头行
-        log += "ID | 角色名称   | 状态   | 时长  | 命中文件          | 所在位置\n"
-        log += "---|------------|--------|-------|-------------------|--------------------------\n"
+        parts.append("ID | 角色名称   | 状态   | 时长  | 命中文件          | 所在位置\n")
+        parts.append("---|------------|--------|-------|-------------------|--------------------------\n")
 
         effective_count = 0
         total_dur_check = 0.0
 
         for d in data:
             # 提取显示名称（去掉 [sX] 和干扰字符）
-            name_match = re.match(r"(\[s\d+\])[\s=:-]*(.*)", d['name'])
+            name_match = _ROLE_PARSE_RE.match(d['name'])
             show_name = (name_match.group(2) if name_match else d['name'])[:10]
             show_name = self._align_text(show_name, 12)
 
             # 状态和时长
             status = d['status'][:6]
             dur = d['dur']
-            dur_str = ("%.1fs" % dur) if dur > 0 else "0.0s"
+            dur_str = f"{dur:.1f}s" if dur > 0 else "0.0s"
             dur_str = self._align_text(dur_str, 7)
 
             # 命中文件处理
@@ -584,7 +795,7 @@ class buding_BatchRoleAudio:
                 short_fname = self._shorten_name(fname)
                 
                 if d['candidates'] and len(d['candidates']) > 1:
-                    file_str = "%s (等%d个)" % (short_fname, len(d['candidates']))
+                    file_str = f"{short_fname} (等{len(d['candidates'])}个)"
                 else:
                     file_str = short_fname
                 
@@ -598,28 +809,24 @@ class buding_BatchRoleAudio:
                 path_str = self._align_text(path_str, 28)
 
             # 组装一行
-            log += "%02d | %s | %s | %s | %s | %s\n" % (
-                d['id'], show_name, status, dur_str, file_str, path_str
-            )
+            parts.append(f"{d['id']:02d} | {show_name} | {status} | {dur_str} | {file_str} | {path_str}\n")
 
             # 统计
             if d['status'] == "✅ 成功":
                 effective_count += 1
                 total_dur_check += d['dur']
 
-        log += "---|------------|--------|-------|-------------------|--------------------------\n\n"
+        parts.append("---|------------|--------|-------|-------------------|--------------------------\n\n")
 
         # 统计行
-        log += "📊 统计: %d角色已加载 | 总时长: %.2fs | 模式: %s(%s)\n" % (
-            effective_count,
-            total_dur_check,
-            "随机选择" if random_sel else "种子固定",
-            "ON" if random_sel else "OFF"
+        parts.append(
+            f"📊 统计: {effective_count}角色已加载 | 总时长: {total_dur_check:.2f}s | "
+            f"模式: {'随机选择' if random_sel else '种子固定'}({'ON' if random_sel else 'OFF'})\n"
         )
-        log += "💡 提示: 文件名已开启[前3---后3]缩减模式，路径仅显示末尾3层。\n"
-        log += "=" * 90 + "\n"
+        parts.append("💡 提示: 文件名已开启[前3---后3]缩减模式，路径仅显示末尾3层。\n")
+        parts.append("=" * 90 + "\n")
 
-        return log
+        return "".join(parts)
 
 
 # 节点注册
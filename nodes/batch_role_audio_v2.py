@@ -13,17 +13,225 @@
 """
 
 import os
+import math
 import re
 import random
+import struct
 import torch
 import numpy as np
 import subprocess
-import tempfile
-import wave
+import threading
 import time
-from pathlib import Path
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from typing import Dict, List, Tuple, Optional
 
+# 尝试导入 pyahocorasick（多角色包含匹配加速，可选）
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# 尝试导入 soundfile（进程内解码，可选）与 scipy（重采样，可选）
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+try:
+    from scipy.signal import resample_poly
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# ffprobe 并行子进程数上限（子进程为 IO/进程绑定，线程池即可并行）
+_SUBPROCESS_MAX_WORKERS = 8
+
+# 支持的音频扩展名（小写元组，供 str.endswith 一次性判断）
+_AUDIO_EXTS = ('.wav', '.mp3', '.flac', '.m4a', '.ogg', '.aac', '.wma')
+
+# 交给 soundfile（libsndfile）进程内解码的扩展名；其余格式（m4a/aac/wma）直接走 ffmpeg
+_SOUNDFILE_EXTS = ('.wav', '.flac', '.ogg', '.mp3')
+
+
+def _wav_duration(path: str) -> Optional[float]:
+    """
+    解析 WAV 头（RIFF/fmt/data 块）计算时长：data 块大小 / 每秒字节数
+    非 RIFF/WAVE 或缺少 fmt、data 块时返回 None
+    """
+    with open(path, 'rb') as fp:
+        header = fp.read(12)
+        if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+            return None
+
+        byte_rate = 0
+        while True:
+            chunk = fp.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk)
+            padded_size = chunk_size + (chunk_size & 1)  # RIFF 块按偶数字节对齐
+
+            if chunk_id == b'fmt ':
+                fmt = fp.read(16)
+                if len(fmt) < 16:
+                    return None
+                byte_rate = struct.unpack_from('<I', fmt, 8)[0]
+                fp.seek(padded_size - 16, os.SEEK_CUR)
+            elif chunk_id == b'data':
+                if not byte_rate:
+                    return None
+                # 数据块长度以实际文件大小为上限（截断文件、流式写入的 0xFFFFFFFF 长度）
+                data_size = min(chunk_size, os.fstat(fp.fileno()).st_size - fp.tell())
+                return data_size / byte_rate
+            else:
+                fp.seek(padded_size, os.SEEK_CUR)
+
+
+def _flac_duration(path: str) -> Optional[float]:
+    """
+    解析 FLAC 的 STREAMINFO 块计算时长：总采样数 / 采样率
+    STREAMINFO 固定为紧跟 "fLaC" 标记的第一个元数据块，采样率（20 位）与总采样数（36 位）位于文件第 18~25 字节
+    """
+    with open(path, 'rb') as fp:
+        header = fp.read(26)
+    if len(header) < 26 or header[:4] != b'fLaC' or (header[4] & 0x7F) != 0:
+        return None
+    packed = int.from_bytes(header[18:26], 'big')
+    sample_rate = packed >> 44
+    total_samples = packed & ((1 << 36) - 1)
+    if not sample_rate or not total_samples:  # 总采样数为 0 表示未知
+        return None
+    return total_samples / sample_rate
+
+
+# 可直接从文件头读出时长的格式
+_HEADER_DURATION_READERS = {
+    '.wav': _wav_duration,
+    '.flac': _flac_duration,
+}
+
+
+def _fast_duration(path: str) -> Optional[float]:
+    """只读文件头获取时长（WAV/FLAC），无法识别时返回 None，由调用方回退到 ffprobe"""
+    reader = _HEADER_DURATION_READERS.get(os.path.splitext(path)[1].lower())
+    if reader is None:
+        return None
+    try:
+        return reader(path)
+    except (OSError, struct.error):
+        return None
+
+
+def _scan_dir_level(path: str, found: List[str], want_dirs: bool) -> List[str]:
+    """扫描单层目录：音频文件追加到 found，返回子目录列表（want_dirs 为 False 时不收集）"""
+    subdirs = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if want_dirs:
+                            subdirs.append(entry.path)
+                    elif entry.is_file() and entry.name.lower().endswith(_AUDIO_EXTS):
+                        found.append(entry.path)
+                except OSError:
+                    continue
+    except OSError:
+        # 目录被删除或无权限访问时跳过（与 os.walk 的默认行为一致）
+        pass
+    return subdirs
+
+
+def _walk_audio_tree(path: str, depth: int, max_depth: int) -> List[str]:
+    """
+    从 path（深度为 depth）开始遍历子树，返回音频文件列表
+    显式栈遍历，子目录逆序入栈，出栈顺序与 os.walk 自顶向下的遍历顺序一致
+    """
+    found = []
+    stack = [(path, depth)]
+    while stack:
+        current, d = stack.pop()
+        subdirs = _scan_dir_level(current, found, d < max_depth)
+        stack.extend((s, d + 1) for s in reversed(subdirs))
+    return found
+
+
+def _decode_soundfile(path: str, sr: int, max_d: float) -> Optional[np.ndarray]:
+    """
+    用 soundfile 在进程内解码为 float32 单声道（多声道取均值，与 ffmpeg -ac 1 一致）
+    采样率不一致时用 scipy.signal.resample_poly 重采样；无 scipy 或解码失败时返回 None，由调用方回退到 ffmpeg
+    """
+    try:
+        with sf.SoundFile(path) as snd:
+            orig_sr = snd.samplerate
+            if orig_sr != sr and not SCIPY_AVAILABLE:
+                return None
+            frames = int(round(max_d * orig_sr)) if max_d > 0 else -1
+            data = snd.read(frames, dtype='float32')
+    except Exception:
+        return None
+
+    if data.ndim > 1:
+        data = data.mean(axis=1, dtype=np.float32)
+    if orig_sr != sr:
+        g = math.gcd(sr, orig_sr)
+        data = resample_poly(data, sr // g, orig_sr // g).astype(np.float32, copy=False)
+    return data
+
+
+def _apply_fade(audio: np.ndarray, sr: int, fade_ms: int) -> None:
+    """原地对 float32 音频做线性淡入淡出（与 ffmpeg afade 默认的 tri 曲线一致）"""
+    n = min(int(sr * fade_ms / 1000), len(audio) // 2)
+    if n <= 0:
+        return
+    ramp = np.linspace(0.0, 1.0, n, dtype=np.float32)
+    audio[:n] *= ramp
+    audio[-n:] *= ramp[::-1]
+
+
+def _dir_mtime(path: str) -> int:
+    """目录的 mtime（纳秒），不存在或不可访问时返回 0"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _build_name_index(files: List[str]) -> List[Tuple[str, str, str]]:
+    """
+    为扫描结果预先计算小写文件名与小写主名：[(文件名, 主名, 路径)]
+    根目录以 / 结尾时（如 Windows 下的 E:/音频库/），scandir 不会再补 os.sep，因此文件名用 basename 取，同时兼容 / 与 \\
+    """
+    index = []
+    for f in files:
+        name = os.path.basename(f).lower()
+        stem = name.rpartition('.')[0]
+        index.append((name, stem or name, f))
+    return index
+
+
+def _build_prefix_buckets(name_index: List[Tuple[str, str, str]]) -> Dict[str, List[Tuple[str, str, str]]]:
+    """按小写主名的首字符分桶（桶内保持扫描顺序），精确/前缀匹配只需查看角色名首字符对应的桶"""
+    buckets: Dict[str, List[Tuple[str, str, str]]] = {}
+    for item in name_index:
+        buckets.setdefault(item[1][:1], []).append(item)
+    return buckets
+
+
+def _ffprobe_duration(path: str) -> float:
+    """使用 ffprobe 获取音频时长（秒），失败时抛出异常"""
+    result = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+         '-of', 'csv=p=0', path],
+        capture_output=True, text=True, timeout=5
+    )
+    return float(result.stdout.strip())
+
 
 class BatchRoleAudioV2:
     """
@@ -44,9 +252,23 @@ class BatchRoleAudioV2:
     - 灵活扩展：支持无限个角色（不再限制20个）
     """
     
-    _path_cache = {}
-    _cache_timestamp = 0
+    # 角色标签正则，类加载时编译一次
+    _ROLE_RE = re.compile(r'\[([^\]]+)\]')
+
+    # 扫描缓存：键为 (根目录, 深度, 根目录 mtime)，值为 (文件列表, 文件名索引, 首字符分桶, 扫描时间)
+    # 每个条目单独计算 TTL；按 LRU 淘汰，多个 library_root 轮换使用时内存有上限
+    _path_cache = OrderedDict()
+    _cache_lock = threading.RLock()  # 保护 _path_cache 的读写（LRU 读取也会移动条目）
     _cache_ttl = 30
+    PATH_CACHE_MAX_ENTRIES = 32
+
+    # 音频时长缓存（LRU，有容量上限）：键为 (路径, mtime_ns, 文件大小)，文件被修改后键自然失效，跨多次执行复用
+    _duration_cache = OrderedDict()
+    DURATION_CACHE_MAX_ENTRIES = 100000
+
+    # ffprobe / 目录遍历 / 音频解码线程池在所有调用间共享，首次使用时创建
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
 
     def __init__(self):
         pass
@@ -137,14 +359,23 @@ class BatchRoleAudioV2:
         if always_reload:
             return float("nan")
         
-        key_params = {
-            'text': text,
-            'library_root': library_root,
-            'roles_mapping': roles_mapping,
-            'random_selection': random_selection,
-            'seed': seed,
-        }
-        return hash(frozenset(key_params.items()))
+        # 所有影响输出的参数直接组成元组哈希；library_root 的 mtime 一并纳入，
+        # 根目录下增删条目时节点会重新执行
+        return hash((
+            text,
+            library_root,
+            roles_mapping,
+            random_selection,
+            seed,
+            kwargs.get("scan_max_depth", 3),
+            kwargs.get("match_mode", "包含匹配"),
+            kwargs.get("min_duration_seconds", 0.5),
+            kwargs.get("target_sample_rate", 44100),
+            kwargs.get("volume_normalization", True),
+            kwargs.get("max_duration_seconds", 30.0),
+            kwargs.get("fade_ms", 10),
+            _dir_mtime(library_root.strip().strip('"\'')),
+        ))
 
     def process_roles_v2(self, **kwargs):
         """
@@ -160,8 +391,8 @@ class BatchRoleAudioV2:
 
         # 清除缓存
         if always_reload:
-            self._path_cache.clear()
-            self._cache_timestamp = 0
+            with self._cache_lock:
+                self._path_cache.clear()
             if debug_mode:
                 print("[V2 DEBUG] 已清除缓存")
 
@@ -181,7 +412,7 @@ class BatchRoleAudioV2:
         if debug_mode:
             print(f"[V2 DEBUG] 开始扫描音频库: {library_root}")
         
-        all_audio_files = self._scan_audio_files_cached(
+        all_audio_files, name_index, prefix_buckets = self._scan_audio_files_cached(
             library_root, 
             kwargs.get("scan_max_depth", 3),
             always_reload,
@@ -191,18 +422,29 @@ class BatchRoleAudioV2:
         if debug_mode:
             print(f"[V2 DEBUG] 音频库共扫描到 {len(all_audio_files)} 个文件")
 
-        # 第4步：为每个角色匹配音频文件
+        # 第4步：为每个角色匹配并选择音频文件
         role_audios = {}
         log_data = []
         total_duration = 0.0
+        plan = []  # [(角色名, 选中文件或 None, 候选文件列表)]
         match_mode = kwargs.get("match_mode", "包含匹配")
 
+        # 包含匹配：未手动映射的角色一次性批量匹配，文件名索引只遍历一遍
+        contains_matches = {}
+        if match_mode not in ("精确匹配", "前缀匹配"):
+            unmapped = [r for r in role_names if r not in roles_mapping_dict]
+            contains_matches = self._match_contains_batch(unmapped, name_index, debug_mode)
+
         for role_name in role_names:
             # 优先：手动映射路径
             if role_name in roles_mapping_dict:
                 role_path = roles_mapping_dict[role_name]
                 if os.path.exists(role_path):
-                    audio_files = self._scan_audio_files(role_path, kwargs.get("scan_max_depth", 3), debug_mode)
+                    # 与音频库共用扫描缓存：映射到 library_root 本身、多个角色映射到同一目录、
+                    # 或跨多次执行时都不再重复遍历
+                    audio_files = self._scan_audio_files_cached(
+                        role_path, kwargs.get("scan_max_depth", 3), False, debug_mode
+                    )[0]
                     if debug_mode:
                         print(f"[V2 DEBUG] 角色 '{role_name}' 使用手动映射: {role_path}, 找到 {len(audio_files)} 个文件")
                 else:
@@ -211,7 +453,11 @@ class BatchRoleAudioV2:
                     audio_files = []
             else:
                 # 自动匹配：从所有文件中按文件名匹配
-                audio_files = self._match_files_by_name(role_name, all_audio_files, match_mode, debug_mode)
+                if role_name in contains_matches:
+                    audio_files = contains_matches[role_name]
+                else:
+                    audio_files = self._match_files_by_name(role_name, name_index, match_mode, debug_mode,
+                                                            prefix_buckets)
                 if debug_mode:
                     print(f"[V2 DEBUG] 角色 '{role_name}' 自动匹配到 {len(audio_files)} 个文件")
 
@@ -220,27 +466,43 @@ class BatchRoleAudioV2:
             valid_files = self._filter_by_duration(audio_files, min_dur, debug_mode)
 
             if not valid_files:
-                log_data.append({
-                    "role": role_name,
-                    "status": "⚠️ 无有效音频" if audio_files else "❌ 未找到",
-                    "path": "-",
-                    "duration": 0.0,
-                    "candidates": len(audio_files)
-                })
+                plan.append((role_name, None, audio_files))
                 continue
 
             # 选择音频文件
             if random_selection:
                 selected_file = random.choice(valid_files)
             else:
-                random.seed(seed + hash(role_name))
-                selected_file = random.choice(valid_files)
+                # 固定种子：由 "种子:角色名" 的 crc32 直接得到下标，不改动全局随机状态，也无需初始化 RNG；
+                # crc32 与进程无关（str 的 hash 受 PYTHONHASHSEED 影响，跨进程不稳定）
+                idx = zlib.crc32(f'{seed}:{role_name}'.encode('utf-8')) % len(valid_files)
+                selected_file = valid_files[idx]
 
             if debug_mode:
                 print(f"[V2 DEBUG] 角色 '{role_name}' 选中: {os.path.basename(selected_file)}")
 
-            # 加载音频
-            audio_data, duration = self._load_audio_ffmpeg(selected_file, kwargs)
+            plan.append((role_name, selected_file, valid_files))
+
+        # 第5步：并行加载所有选中的音频（选择已按角色顺序完成，随机序列与串行一致）
+        executor = self._get_executor()
+        futures = {
+            role_name: executor.submit(self._load_audio_ffmpeg, selected_file, kwargs)
+            for role_name, selected_file, _ in plan if selected_file is not None
+        }
+
+        # 第6步：按角色顺序收集结果
+        for role_name, selected_file, candidates in plan:
+            if selected_file is None:
+                log_data.append({
+                    "role": role_name,
+                    "status": "⚠️ 无有效音频" if candidates else "❌ 未找到",
+                    "path": "-",
+                    "duration": 0.0,
+                    "candidates": len(candidates)
+                })
+                continue
+
+            audio_data, duration = futures[role_name].result()
             
             if audio_data:
                 role_audios[role_name] = audio_data
@@ -250,7 +512,7 @@ class BatchRoleAudioV2:
                     "status": "✅ 成功",
                     "path": os.path.basename(selected_file),
                     "duration": duration,
-                    "candidates": len(valid_files)
+                    "candidates": len(candidates)
                 })
             else:
                 log_data.append({
@@ -258,7 +520,7 @@ class BatchRoleAudioV2:
                     "status": "❌ 加载失败",
                     "path": os.path.basename(selected_file),
                     "duration": 0.0,
-                    "candidates": len(valid_files)
+                    "candidates": len(candidates)
                 })
 
         # 生成日志报告
@@ -275,16 +537,10 @@ class BatchRoleAudioV2:
         返回去重后的角色列表
         """
         # 正则匹配所有 [xxx] 格式
-        pattern = r'\[([^\]]+)\]'
-        matches = re.findall(pattern, text)
+        matches = self._ROLE_RE.findall(text)
         
         # 去重并保持顺序
-        seen = set()
-        role_names = []
-        for match in matches:
-            if match not in seen:
-                seen.add(match)
-                role_names.append(match)
+        role_names = list(dict.fromkeys(matches))
         
         if debug_mode:
             print(f"[V2 DEBUG] 提取角色: {role_names}")
@@ -332,87 +588,123 @@ class BatchRoleAudioV2:
         """
         pass
 
-    def _scan_audio_files_cached(self, root: str, max_depth: int, force_reload: bool, debug_mode: bool = False) -> List[str]:
+    def _scan_audio_files_cached(self, root: str, max_depth: int, force_reload: bool,
+                                 debug_mode: bool = False) -> Tuple[List[str], List[Tuple[str, str, str]],
+                                                                     Dict[str, List[Tuple[str, str, str]]]]:
         """
         带缓存的音频文件扫描（TTL 30秒）
+        返回 (文件列表, 小写文件名索引, 首字符分桶)，索引与分桶和文件列表一起缓存，所有角色共用
+        缓存键包含根目录 mtime：根目录下增删条目立即失效；深层子目录的变化不会更新根目录 mtime，仍依赖 TTL
         """
         now = time.time()
-        cache_key = f"{root}_{max_depth}"
+        cache_key = (root, max_depth, _dir_mtime(root))
         
         # 检查缓存
-        if not force_reload and cache_key in self._path_cache:
-            cache_age = now - self._cache_timestamp
+        cached = None
+        if not force_reload:
+            with self._cache_lock:
+                cached = self._cache_get(self._path_cache, cache_key)
+        if cached is not None:
+            files, name_index, prefix_buckets, ts = cached
+            cache_age = now - ts
             if cache_age < self._cache_ttl:
                 if debug_mode:
                     print(f"[V2 DEBUG] 使用缓存 (年龄: {cache_age:.1f}s)")
-                return self._path_cache[cache_key]
+                return files, name_index, prefix_buckets
             elif debug_mode:
                 print(f"[V2 DEBUG] 缓存过期 (年龄: {cache_age:.1f}s)")
         
-        # 扫描文件
+        # 扫描文件并建立文件名索引
         files = self._scan_audio_files(root, max_depth, debug_mode)
+        name_index = _build_name_index(files)
+        prefix_buckets = _build_prefix_buckets(name_index)
         
         # 更新缓存
-        self._path_cache[cache_key] = files
-        self._cache_timestamp = now
+        with self._cache_lock:
+            self._cache_put(self._path_cache, cache_key, (files, name_index, prefix_buckets, now),
+                            self.PATH_CACHE_MAX_ENTRIES)
         
         if debug_mode:
             print(f"[V2 DEBUG] 扫描完成，找到 {len(files)} 个文件")
         
-        return files
+        return files, name_index, prefix_buckets
 
-    def _match_files_by_name(self, role_name: str, files: List[str], match_mode: str, debug_mode: bool = False) -> List[str]:
+    def _match_files_by_name(self, role_name: str, name_index: List[Tuple[str, str, str]],
+                             match_mode: str, debug_mode: bool = False,
+                             prefix_buckets: Optional[Dict[str, List[Tuple[str, str, str]]]] = None) -> List[str]:
         """
         根据角色名匹配文件名
         支持三种模式：精确匹配、前缀匹配、包含匹配
+        name_index 为 _build_name_index 生成的 [(小写文件名, 小写主名, 路径)]；
+        提供 prefix_buckets 时，精确/前缀匹配只扫描角色名首字符对应的桶
         """
         role_name_lower = role_name.lower()
-        matched = []
+        candidates = name_index
+        if prefix_buckets is not None and match_mode in ("精确匹配", "前缀匹配"):
+            candidates = prefix_buckets.get(role_name_lower[:1], [])
         
-        for f in files:
-            filename = os.path.basename(f).lower()
-            filename_noext = os.path.splitext(filename)[0]
-            
-            is_match = False
-            
-            if match_mode == "精确匹配":
-                if filename_noext == role_name_lower:
-                    is_match = True
-            elif match_mode == "前缀匹配":
-                if filename_noext.startswith(role_name_lower):
-                    is_match = True
-            else:  # 包含匹配（默认）
-                if role_name_lower in filename:
-                    is_match = True
-            
-            if is_match:
-                matched.append(f)
+        if match_mode == "精确匹配":
+            matched = [f for _, stem, f in candidates if stem == role_name_lower]
+        elif match_mode == "前缀匹配":
+            matched = [f for _, stem, f in candidates if stem.startswith(role_name_lower)]
+        else:  # 包含匹配（默认）
+            matched = [f for name, _, f in name_index if role_name_lower in name]
         
         if debug_mode and matched:
             print(f"[V2 DEBUG] 角色 '{role_name}' 匹配到文件示例: {os.path.basename(matched[0])}")
         
         return matched
 
+    def _match_contains_batch(self, role_names: List[str], name_index: List[Tuple[str, str, str]],
+                              debug_mode: bool = False) -> Dict[str, List[str]]:
+        """
+        包含匹配的批量版本：一次遍历文件名索引，同时得到所有角色的匹配结果
+        已安装 pyahocorasick 时用 Aho-Corasick 自动机做多模式匹配，否则逐角色子串查找
+        返回 {角色名: 匹配文件列表}，列表顺序与扫描顺序一致
+        """
+        if not AHOCORASICK_AVAILABLE or not role_names:
+            return {r: self._match_files_by_name(r, name_index, "包含匹配", debug_mode) for r in role_names}
+
+        automaton = ahocorasick.Automaton()
+        for role_name in role_names:
+            key = role_name.lower()
+            automaton.add_word(key, key)
+        automaton.make_automaton()
+
+        by_key: Dict[str, List[str]] = {}
+        for name, _, f in name_index:
+            for _, key in automaton.iter(name):
+                matched = by_key.setdefault(key, [])
+                if not matched or matched[-1] is not f:  # 同一文件名中多次出现只记一次
+                    matched.append(f)
+
+        result = {}
+        for role_name in role_names:
+            matched = by_key.get(role_name.lower(), [])
+            if debug_mode and matched:
+                print(f"[V2 DEBUG] 角色 '{role_name}' 匹配到文件示例: {os.path.basename(matched[0])}")
+            result[role_name] = list(matched)
+        return result
+
     def _scan_audio_files(self, path: str, max_depth: int, debug_mode: bool = False) -> List[str]:
         """
         扫描指定路径下的所有音频文件
+        基于 os.scandir 遍历；根目录下的各个一级子目录分别提交到线程池并行遍历，
+        结果按 根目录文件 → 各子树（按列出顺序）拼接，与 os.walk 的顺序一致
         """
-        exts = {'.wav', '.mp3', '.flac', '.m4a', '.ogg', '.aac', '.wma'}
         found = []
         
         if not os.path.exists(path):
             return found
 
         try:
-            for root, dirs, files in os.walk(path):
-                curr_depth = len(Path(root).relative_to(Path(path)).parts)
-                if curr_depth > max_depth:  # 修复：应该是 > 而不是 >=
-                    dirs[:] = []
-                    continue
-                
-                for f in files:
-                    if os.path.splitext(f)[1].lower() in exts:
-                        found.append(os.path.join(root, f))
+            subdirs = _scan_dir_level(path, found, max_depth > 0)
+            if len(subdirs) > 1:
+                executor = self._get_executor()
+                futures = [executor.submit(_walk_audio_tree, d, 1, max_depth) for d in subdirs]
+                found.extend(chain.from_iterable(future.result() for future in futures))
+            elif subdirs:
+                found.extend(_walk_audio_tree(subdirs[0], 1, max_depth))
         except Exception as e:
             if debug_mode:
                 print(f"[V2 ERROR] 扫描失败 {path}: {e}")
@@ -426,66 +718,107 @@ class BatchRoleAudioV2:
         if min_duration <= 0:
             return files
 
-        valid = []
+        # 第1遍：查时长缓存，WAV/FLAC 直接读文件头；其余文件留给 ffprobe
+        durations: Dict[str, float] = {}
+        to_probe = []
         for f in files:
             try:
-                result = subprocess.run(
-                    ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
-                     '-of', 'csv=p=0', f],
-                    capture_output=True, text=True, timeout=5
-                )
-                duration = float(result.stdout.strip())
-                
-                if duration >= min_duration:
-                    valid.append(f)
-                elif debug_mode:
-                    print(f"[V2 DEBUG] 过滤短音频: {os.path.basename(f)} ({duration:.2f}s)")
-            except Exception as e:
+                st = os.stat(f)
+            except OSError as e:
                 if debug_mode:
                     print(f"[V2 DEBUG] 检测时长失败 {os.path.basename(f)}: {e}")
+                continue
+            cache_key = (f, st.st_mtime_ns, st.st_size)
+            duration = self._cache_get(self._duration_cache, cache_key)
+            if duration is None:
+                duration = _fast_duration(f)
+                if duration is not None:
+                    self._cache_put(self._duration_cache, cache_key, duration, self.DURATION_CACHE_MAX_ENTRIES)
+            if duration is None:
+                to_probe.append((f, cache_key))
+            else:
+                durations[f] = duration
+
+        # 第2遍：其余文件并行调用 ffprobe
+        if to_probe:
+            executor = self._get_executor()
+            futures = [(f, cache_key, executor.submit(_ffprobe_duration, f)) for f, cache_key in to_probe]
+            for f, cache_key, future in futures:
+                try:
+                    duration = future.result()
+                except Exception as e:
+                    if debug_mode:
+                        print(f"[V2 DEBUG] 检测时长失败 {os.path.basename(f)}: {e}")
+                    continue
+                self._cache_put(self._duration_cache, cache_key, duration, self.DURATION_CACHE_MAX_ENTRIES)
+                durations[f] = duration
+
+        valid = []
+        for f in files:
+            duration = durations.get(f)
+            if duration is None:
                 valid.append(f)  # 保守处理
+            elif duration >= min_duration:
+                valid.append(f)
+            elif debug_mode:
+                print(f"[V2 DEBUG] 过滤短音频: {os.path.basename(f)} ({duration:.2f}s)")
 
         return valid
 
+    @staticmethod
+    def _cache_get(store: OrderedDict, key):
+        """读取LRU缓存，命中时移到末尾"""
+        value = store.get(key)
+        if value is not None:
+            store.move_to_end(key)
+        return value
+
+    @staticmethod
+    def _cache_put(store: OrderedDict, key, value, max_entries: int):
+        """写入LRU缓存，超出容量时淘汰最久未使用的条目"""
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > max_entries:
+            store.popitem(last=False)
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        """获取共享线程池（ffprobe、目录遍历与音频解码共用），首次使用时创建"""
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=_SUBPROCESS_MAX_WORKERS,
+                                                   thread_name_prefix="buding_role_audio_v2")
+            return cls._executor
+
     def _load_audio_ffmpeg(self, path: str, kwargs: dict) -> Tuple[Optional[dict], float]:
         """
-        使用 FFmpeg 加载音频
+        加载音频
+        已安装 soundfile 时优先在进程内解码（省去 ffmpeg 子进程启动开销），
+        soundfile 不支持的格式或解码失败时回退到 FFmpeg
         返回: (audio_dict, duration)
         """
         sr = kwargs.get("target_sample_rate", 44100)
         max_d = kwargs.get("max_duration_seconds", 30.0)
         fade_ms = kwargs.get("fade_ms", 10)
+        normalize = kwargs.get("volume_normalization", True)
 
-        tmp_p = None
         try:
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp:
-                tmp_p = tmp.name
-
-            cmd = ['ffmpeg', '-y', '-i', path]
-
-            if max_d > 0:
-                cmd.extend(['-t', str(max_d)])
+            audio_np = None
+            if SOUNDFILE_AVAILABLE and path.lower().endswith(_SOUNDFILE_EXTS):
+                audio_np = _decode_soundfile(path, sr, max_d)
+
+            if audio_np is not None:
+                # 音量标准化：解码结果为本地数组，原地缩放
+                if normalize and len(audio_np) > 0:
+                    peak = max(-float(audio_np.min()), float(audio_np.max()))
+                    if peak > 0:
+                        audio_np *= np.float32(0.95 / peak)
+            else:
+                audio_np = self._decode_ffmpeg(path, sr, max_d, normalize)
 
+            # 淡入淡出统一在解码后用 NumPy 完成，只处理首尾 fade_ms 范围内的样本
             if fade_ms > 0:
-                f = fade_ms / 1000.0
-                fade_out_start = max(0, max_d - f) if max_d > 0 else 1
-                cmd.extend([
-                    '-af',
-                    f'afade=t=in:st=0:d={f},afade=t=out:st={fade_out_start}:d={f}'
-                ])
-
-            cmd.extend(['-ar', str(sr), '-ac', '1', '-f', 'wav', tmp_p])
-
-            subprocess.run(cmd, capture_output=True, check=True, timeout=15)
-
-            with wave.open(tmp_p, 'rb') as wf:
-                audio_np = np.frombuffer(wf.readframes(-1), dtype=np.int16).astype(np.float32) / 32768.0
-
-            # 音量标准化
-            if kwargs.get("volume_normalization", True) and len(audio_np) > 0:
-                peak = np.max(np.abs(audio_np))
-                if peak > 0:
-                    audio_np *= (0.95 / peak)
+                _apply_fade(audio_np, sr, fade_ms)
 
             audio_tensor = torch.from_numpy(audio_np).unsqueeze(0).unsqueeze(0)
             return {
@@ -497,12 +830,30 @@ class BatchRoleAudioV2:
             print(f"[V2 ERROR] 加载音频失败 {path}: {e}")
             return None, 0
 
-        finally:
-            if tmp_p and os.path.exists(tmp_p):
-                try:
-                    os.unlink(tmp_p)
-                except:
-                    pass
+    def _decode_ffmpeg(self, path: str, sr: int, max_d: float, normalize: bool) -> np.ndarray:
+        """
+        FFmpeg 解码：直接输出原始 s16le PCM 到 stdout，不经过临时 WAV 文件
+        只做解码/截断/重采样，不建立滤镜图；返回标准化后的 float32 单声道数组
+        """
+        # 多个角色并行加载，每个 ffmpeg 限制为单线程，避免线程超额订阅
+        cmd = ['ffmpeg', '-y', '-threads', '1', '-i', path]
+
+        if max_d > 0:
+            cmd.extend(['-t', str(max_d)])
+
+        cmd.extend(['-ar', str(sr), '-ac', '1', '-f', 's16le', '-acodec', 'pcm_s16le', 'pipe:1'])
+
+        proc = subprocess.run(cmd, capture_output=True, check=True, timeout=15)
+        raw = np.frombuffer(proc.stdout, dtype=np.int16)
+
+        # 音量标准化：峰值直接在 int16 上求（避免 np.abs 在 -32768 处溢出），
+        # 转 float32 与缩放合并为一次 np.multiply
+        scale = 1.0 / 32768.0
+        if normalize and len(raw) > 0:
+            peak = max(-int(raw.min()), int(raw.max()))
+            if peak > 0:
+                scale = 0.95 / peak
+        return np.multiply(raw, np.float32(scale), dtype=np.float32)
 
     def _generate_log_report(self, log_data: List[dict], total_duration: float, 
                             seed: int, total_roles: int, kwargs: dict) -> str:
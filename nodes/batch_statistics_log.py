@@ -1,9 +1,143 @@
 import os
 import re
 import time
+from collections import Counter
+from datetime import datetime
 from pathlib import Path
 from typing import List, Dict, Any, Tuple
 
+# 日志解析用正则，模块加载时编译一次
+_RE_FILE_COUNT = re.compile(r"✅ 文件总数: (\d+)")
+_RE_ROOT_DIR = re.compile(r"📂 根目录: (.*)")
+_RE_DATA = re.compile(r"📉 数据量: 扫描 (\d+) 行 -> 筛选输出 (\d+) 行")
+_RE_FILE_LIST = re.compile(r"🏷️ 文件名清单 \(前 \d+ 个\):\n([\s\S]*?)-{10,}")
+_RE_END_POS = re.compile(r"📍 结束位置: (.*)")
+_RE_END_LINE = re.compile(r"📌 结束行号: 第 (\d+) 行")
+_RE_IMG = re.compile(r"🖼️ 图像: (\d+)")
+_RE_VID = re.compile(r"🎬 视频: (\d+)")
+_RE_AUD = re.compile(r"🎵 音频: (\d+)")
+_RE_TXT = re.compile(r"📄 文本: (\d+)")
+_RE_XLS = re.compile(r"📊 Excel: (\d+)")
+_RE_TIME = re.compile(r"🕒 时间: (.*)")
+_RE_END_FILE = re.compile(r"🔚 结束于: (.*)")
+_RE_TOTAL = re.compile(r"🔢 总计: (\d+)")
+_RE_HIST = re.compile(r"已处理文件: (\d+)/(\d+)")
+_RE_TASK_START = re.compile(r"本次任务开始时间: (.*)")
+_RE_RESET = re.compile(r"上次重置时间: (.*)")
+_RE_DIGITS = re.compile(r"\d+")
+_RE_LIST_NUM = re.compile(r"^\s*\d+\.\s*")
+# 追加模式的标题序号：⭐数字⭐标题⭐🕒 报告时间:
+_RE_APPEND_IDX = re.compile(r"⭐(\d+)⭐.*⭐🕒 报告时间:")
+# 追加模式只读文件尾部的字节数（序号单调递增，最大序号在末尾）
+_APPEND_TAIL_BYTES = 64 * 1024
+
+
+# 日志块起始标记
+_BLOCK_MARKERS = ("📊", "📥")
+
+
+def _split_blocks(logs: str) -> List[str]:
+    """在每个 📊 / 📥 之前切分日志（与 re.split(r"(?=📊|📥)") 等价，用 str.find 定位）"""
+    cuts = []
+    for marker in _BLOCK_MARKERS:
+        pos = logs.find(marker)
+        while pos != -1:
+            cuts.append(pos)
+            pos = logs.find(marker, pos + 1)
+    cuts.sort()
+    bounds = [0] + cuts + [len(logs)]
+    return [logs[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+# 耗时字段标记
+_DUR_MARKER = "总生成时间: "
+
+
+def _iter_durations(block: str):
+    """
+    逐个取出 "总生成时间: <数字>秒" 中的数值（匹配规则同 r"总生成时间: (\d+\.?\d*)秒"）
+    用 str.find 定位标记后按字符切片，块中没有标记时只做一次子串查找
+    """
+    n = len(block)
+    pos = block.find(_DUR_MARKER)
+    while pos != -1:
+        start = end = pos + len(_DUR_MARKER)
+        while end < n and block[end].isdecimal():
+            end += 1
+        if end > start:
+            if end < n and block[end] == ".":
+                end += 1
+                while end < n and block[end].isdecimal():
+                    end += 1
+            if end < n and block[end] == "秒":
+                yield float(block[start:end])
+        pos = block.find(_DUR_MARKER, start)
+
+
+# 扩展名（小写，不含点）→ 资产类型
+_EXT_KIND = {
+    "txt": "texts",
+    "xlsx": "excel", "xls": "excel",
+    "png": "images", "jpg": "images", "jpeg": "images",
+    "mp4": "videos", "avi": "videos", "mov": "videos", "webm": "videos",
+    "wav": "audios", "mp3": "audios", "flac": "audios",
+}
+
+
+def _ext_kind(name: str):
+    """按扩展名识别资产类型，无法识别时返回 None"""
+    head, dot, ext = name.rstrip().rpartition(".")
+    return _EXT_KIND.get(ext.lower()) if dot else None
+
+
+# 各正则的字面前缀：块中不含该子串时正则必然不匹配，可直接跳过
+_MARKERS = {
+    _RE_FILE_COUNT: "✅ 文件总数: ",
+    _RE_ROOT_DIR: "📂 根目录: ",
+    _RE_DATA: "📉 数据量: 扫描 ",
+    _RE_FILE_LIST: "🏷️ 文件名清单 (",
+    _RE_END_POS: "📍 结束位置: ",
+    _RE_END_LINE: "📌 结束行号: 第 ",
+    _RE_IMG: "🖼️ 图像: ",
+    _RE_VID: "🎬 视频: ",
+    _RE_AUD: "🎵 音频: ",
+    _RE_TXT: "📄 文本: ",
+    _RE_XLS: "📊 Excel: ",
+    _RE_TIME: "🕒 时间: ",
+    _RE_END_FILE: "🔚 结束于: ",
+    _RE_TOTAL: "🔢 总计: ",
+    _RE_HIST: "已处理文件: ",
+    _RE_TASK_START: "本次任务开始时间: ",
+    _RE_RESET: "上次重置时间: ",
+}
+
+
+def _search(pattern, block: str):
+    """先做子串预筛，块中含有该正则的字面前缀时才运行正则"""
+    return pattern.search(block) if _MARKERS[pattern] in block else None
+
+
+def _parse_time(value: str):
+    """
+    解析 "%Y-%m-%d %H:%M:%S" / "%Y-%m-%d %H:%M" 格式的时间，失败返回 None
+    日志中的标准零填充格式按固定位置切片直接构造 datetime，其余写法回退到 strptime
+    """
+    n = len(value)
+    if ((n == 19 and value[16] == ":") or n == 16) and value[4] == "-" and value[7] == "-" \
+            and value[10] == " " and value[13] == ":":
+        try:
+            return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                            int(value[11:13]), int(value[14:16]), int(value[17:19]) if n == 19 else 0)
+        except ValueError:
+            pass
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+
 class buding_BatchStatisticsLog:
     """
     📊 批量统计日志节点
@@ -31,6 +165,11 @@ class buding_BatchStatisticsLog:
     FUNCTION = "generate_report"
     CATEGORY = "buding_Tools/Log"
 
+    # 报告中的固定分隔线，类加载时生成一次
+    _SEPARATOR = "◆ ◇ " * 35 + "◆"  # 报告末尾分隔符 (加长版)
+    _EQ50 = "=" * 50
+    _DASH40 = "-" * 40
+
     def generate_report(self, input_logs: str, target_path: str, filename_prefix: str, mode: str,
                         report_title: str, header_text: str, footer_text: str, 
                         prepend_newline: bool, auto_create_dirs: bool):
@@ -73,17 +212,14 @@ class buding_BatchStatisticsLog:
             report_content = self._build_report(index_str, report_title, header_text, parsed_data, footer_text)
             
             # 5. 保存文件
-            # 设定分隔符 (加长版)
-            separator = "◆ ◇ " * 35 + "◆"
             # 分隔符仅放在最后一行
-            final_content = f"{report_content}\n{separator}"
+            final_content = report_content + "\n" + self._SEPARATOR
 
-            if write_mode == "a" and full_path.exists():
-                # 追加模式下，先补两个换行
-                with open(full_path, "a", encoding="utf-8") as f:
-                    f.write("\n\n")
-                
+            # 追加到已有文件时，按 prepend_newline 先补两个换行（与正文在同一次打开中写入）
+            add_newlines = write_mode == "a" and prepend_newline and full_path.exists()
             with open(full_path, write_mode, encoding="utf-8") as f:
+                if add_newlines:
+                    f.write("\n\n")
                 f.write(final_content)
             
             # 6. 生成预览
@@ -101,24 +237,21 @@ class buding_BatchStatisticsLog:
             return ("", False, error_msg)
 
     def _get_next_index(self, directory: Path, prefix: str) -> int:
-        """扫描目录获取下一个序号"""
-        import glob
+        """扫描目录获取下一个序号（os.scandir 单次遍历，按前缀/后缀做字符串过滤）"""
         try:
-            pattern = os.path.join(str(directory), f"{prefix}*.txt")
-            files = glob.glob(pattern)
-            
+            plen = len(prefix)
             max_idx = 0
-            for f in files:
-                name = os.path.basename(f)
-                # 提取前缀后的数字部分
-                match = re.search(rf"{re.escape(prefix)}(\d+)", name)
-                if match:
-                    try:
-                        idx = int(match.group(1))
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    name = entry.name
+                    if not (name.startswith(prefix) and name.endswith(".txt")):
+                        continue
+                    # 提取前缀后紧跟的数字部分
+                    match = _RE_DIGITS.match(name, plen)
+                    if match:
+                        idx = int(match.group())
                         if idx > max_idx:
                             max_idx = idx
-                    except ValueError:
-                        continue
             return max_idx + 1
         except Exception:
             return 1
@@ -129,13 +262,23 @@ class buding_BatchStatisticsLog:
             return 1
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            size = file_path.stat().st_size
+            with open(file_path, 'rb') as f:
+                if size > _APPEND_TAIL_BYTES:
+                    # 追加写入的序号单调递增，最大序号必在最后几份报告中：先只读尾部
+                    f.seek(size - _APPEND_TAIL_BYTES)
+                    tail = f.read()
+                    # 丢弃被截断的首行，避免半行内容误匹配
+                    tail = tail[tail.find(b"\n") + 1:]
+                    matches = _RE_APPEND_IDX.findall(tail.decode('utf-8', errors='ignore'))
+                    if matches:
+                        return max(int(match) for match in matches) + 1
+                    # 尾部没有标题行时回退到读取全文
+                    f.seek(0)
+                content = f.read().decode('utf-8')
             
             # 提取标题开头序号 ⭐0001⭐ (在新格式中只匹配标题序号，不匹配末尾数字)
-            # 匹配模式：⭐数字⭐标题⭐🕒 报告时间:
-            pattern = r"⭐(\d+)⭐.*⭐🕒 报告时间:"
-            matches = re.findall(pattern, content)
+            matches = _RE_APPEND_IDX.findall(content)
             
             if matches:
                 # 找到最大序号并+1
@@ -183,7 +326,9 @@ class buding_BatchStatisticsLog:
             return data
 
         # 分割日志块（按 📊 或 📥 分割）
-        blocks = re.split(r"(?=📊|📥)", logs)
+        blocks = _split_blocks(logs)
+        total_duration = 0.0
+        has_duration = False
         
         for block in blocks:
             block = block.strip()
@@ -192,42 +337,34 @@ class buding_BatchStatisticsLog:
             # --- 1. 解析 📥 批量读取统计 (TXT) ---
             if "📥 批量读取统计" in block:
                 inp = {}
-                m_count = re.search(r"✅ 文件总数: (\d+)", block)
+                m_count = _search(_RE_FILE_COUNT, block)
                 if m_count: inp["file_count"] = m_count.group(1)
                 
-                m_dir = re.search(r"📂 根目录: (.*)", block)
+                m_dir = _search(_RE_ROOT_DIR, block)
                 if m_dir: inp["root_dir"] = m_dir.group(1).strip()
                 
-                m_data = re.search(r"📉 数据量: 扫描 (\d+) 行 -> 筛选输出 (\d+) 行", block)
+                m_data = _search(_RE_DATA, block)
                 if m_data:
                     inp["scanned_lines"] = m_data.group(1)
                     inp["output_lines"] = m_data.group(2)
                 
-                m_list = re.search(r"🏷️ 文件名清单 \(前 \d+ 个\):\n([\s\S]*?)-{10,}", block)
+                m_list = _search(_RE_FILE_LIST, block)
                 if m_list:
                     file_list = m_list.group(1).strip()
                     inp["file_list"] = file_list
-                    # 自动识别文件清单中的资产类型
-                    for line in file_list.split("\n"):
-                        line_lower = line.lower()
-                        if ".txt" in line_lower:
-                            data["assets"]["texts"] += 1
-                        elif ".xlsx" in line_lower or ".xls" in line_lower:
-                            data["assets"]["excel"] += 1
-                        elif ".png" in line_lower or ".jpg" in line_lower or ".jpeg" in line_lower:
-                            data["assets"]["images"] += 1
-                        elif ".mp4" in line_lower or ".avi" in line_lower or ".mov" in line_lower:
-                            data["assets"]["videos"] += 1
-                        elif ".wav" in line_lower or ".mp3" in line_lower or ".flac" in line_lower:
-                            data["assets"]["audios"] += 1
+                    # 自动识别文件清单中的资产类型（按扩展名查表，统计后一次性合并）
+                    kinds = Counter(_ext_kind(line) for line in file_list.split("\n") if "." in line)
+                    kinds.pop(None, None)
+                    for kind, count in kinds.items():
+                        data["assets"][kind] += count
                 
-                m_end_pos = re.search(r"📍 结束位置: (.*)", block)
+                m_end_pos = _search(_RE_END_POS, block)
                 if m_end_pos:
                     end_pos = m_end_pos.group(1).strip()
                     inp["end_pos"] = end_pos
                     data["assets"]["end_pos"] = end_pos  # 同步到assets
                 
-                m_end_line = re.search(r"📌 结束行号: 第 (\d+) 行", block)
+                m_end_line = _search(_RE_END_LINE, block)
                 if m_end_line:
                     end_line = m_end_line.group(1)
                     inp["end_line"] = end_line
@@ -237,87 +374,81 @@ class buding_BatchStatisticsLog:
 
             # --- 2. 解析 📊 批量加载完成 (Assets) ---
             elif "📊 批量加载完成" in block:
-                m_img = re.search(r"🖼️ 图像: (\d+)", block)
+                m_img = _search(_RE_IMG, block)
                 if m_img: data["assets"]["images"] = int(m_img.group(1))
                 
-                m_vid = re.search(r"🎬 视频: (\d+)", block)
+                m_vid = _search(_RE_VID, block)
                 if m_vid: data["assets"]["videos"] = int(m_vid.group(1))
                 
-                m_aud = re.search(r"🎵 音频: (\d+)", block)
+                m_aud = _search(_RE_AUD, block)
                 if m_aud: data["assets"]["audios"] = int(m_aud.group(1))
                 
-                m_txt = re.search(r"📄 文本: (\d+)", block)
+                m_txt = _search(_RE_TXT, block)
                 if m_txt: data["assets"]["texts"] = int(m_txt.group(1))
                 
-                m_xls = re.search(r"📊 Excel: (\d+)", block)
+                m_xls = _search(_RE_XLS, block)
                 if m_xls: data["assets"]["excel"] = int(m_xls.group(1))
                 
-                m_time = re.search(r"🕒 时间: (.*)", block)
+                m_time = _search(_RE_TIME, block)
                 if m_time: 
                     data["system"]["time"] = m_time.group(1).strip()
                     data["system"]["load_time"] = m_time.group(1).strip()
 
             # --- 3. 解析 📊 批量保存完成 (ListReceiveInfo) ---
             elif "📊 批量保存完成 |" in block:
-                m_dir = re.search(r"📂 根目录: (.*)", block)
+                m_dir = _search(_RE_ROOT_DIR, block)
                 if m_dir: data["system"]["root_dir"] = m_dir.group(1).strip()
 
-                m_time = re.search(r"🕒 时间: (.*)", block)
+                m_time = _search(_RE_TIME, block)
                 if m_time:
                     ts = m_time.group(1).strip()
                     data["system"]["time"] = ts
                     data["system"]["save_time"] = ts
                 
                 # 自动提取结束文件名并识别类型
-                m_end_file = re.search(r"🔚 结束于: (.*)", block)
+                m_end_file = _search(_RE_END_FILE, block)
                 if m_end_file:
                     filename = m_end_file.group(1).strip()
                     data["output"]["last_file"] = filename
                     # 根据扩展名自动识别产出类型
-                    filename_lower = filename.lower()
-                    if ".png" in filename_lower or ".jpg" in filename_lower or ".jpeg" in filename_lower:
-                        m_count = re.search(r"🔢 总计: (\d+)", block)
-                        if m_count: data["output"]["images"] = int(m_count.group(1))
-                    elif ".mp4" in filename_lower or ".avi" in filename_lower or ".mov" in filename_lower or ".webm" in filename_lower:
-                        m_count = re.search(r"🔢 总计: (\d+)", block)
-                        if m_count: data["output"]["videos"] = int(m_count.group(1))
-                    elif ".wav" in filename_lower or ".mp3" in filename_lower or ".flac" in filename_lower:
-                        m_count = re.search(r"🔢 总计: (\d+)", block)
-                        if m_count: data["output"]["audios"] = int(m_count.group(1))
+                    kind = _ext_kind(filename)
+                    if kind in ("images", "videos", "audios"):
+                        m_count = _search(_RE_TOTAL, block)
+                        if m_count: data["output"][kind] = int(m_count.group(1))
 
             # --- 4. 解析 📊 批量保存完成 (Output) ---
             elif "📊 批量保存完成" in block:
-                m_img = re.search(r"🖼️ 图像: (\d+)", block)
+                m_img = _search(_RE_IMG, block)
                 if m_img: data["output"]["images"] = int(m_img.group(1))
                 
-                m_vid = re.search(r"🎬 视频: (\d+)", block)
+                m_vid = _search(_RE_VID, block)
                 if m_vid: data["output"]["videos"] = int(m_vid.group(1))
                 
-                m_aud = re.search(r"🎵 音频: (\d+)", block)
+                m_aud = _search(_RE_AUD, block)
                 if m_aud: data["output"]["audios"] = int(m_aud.group(1))
                 
-                m_dir = re.search(r"📂 根目录: (.*)", block)
+                m_dir = _search(_RE_ROOT_DIR, block)
                 if m_dir: data["system"]["root_dir"] = m_dir.group(1).strip()
                 
-                m_time = re.search(r"🕒 时间: (.*)", block)
+                m_time = _search(_RE_TIME, block)
                 if m_time: 
                     data["system"]["time"] = m_time.group(1).strip()
                     data["system"]["save_time"] = m_time.group(1).strip()
 
             # --- 4. 解析 📊 历史统计 ---
             elif "📊 历史统计" in block:
-                m_hist = re.search(r"已处理文件: (\d+)/(\d+)", block)
+                m_hist = _search(_RE_HIST, block)
                 if m_hist:
                     data["history"]["processed"] = int(m_hist.group(1))
                     data["history"]["total"] = int(m_hist.group(2))
 
                 # 优先解析本次任务开始时间
-                m_task_start = re.search(r"本次任务开始时间: (.*)", block)
+                m_task_start = _search(_RE_TASK_START, block)
                 if m_task_start:
                     data["system"]["task_start_time"] = m_task_start.group(1).strip()
                 
                 # 解析上次重置时间
-                m_reset = re.search(r"上次重置时间: (.*)", block)
+                m_reset = _search(_RE_RESET, block)
                 if m_reset:
                     data["system"]["reset_time"] = m_reset.group(1).strip()
                 
@@ -325,25 +456,18 @@ class buding_BatchStatisticsLog:
                 if not data["system"].get("task_start_time") and data["system"].get("reset_time"):
                     data["system"]["task_start_time"] = data["system"]["reset_time"]
 
-            # --- 5. 解析耗时 ---
-            durations = re.findall(r"总生成时间: (\d+\.?\d*)秒", block)
-            if durations:
-                current_dur = float(data["system"]["duration"])
-                data["system"]["duration"] = f"{current_dur + sum(float(d) for d in durations):.2f}"
+            # --- 5. 解析耗时（累加为浮点数，全部块处理完后统一格式化） ---
+            # 不再逐块四舍五入到两位小数，总计更精确，块数较多时可能与旧版结果不同
+            for d in _iter_durations(block):
+                total_duration += d
+                has_duration = True
+
+        if has_duration:
+            data["system"]["duration"] = f"{total_duration:.2f}"
 
         # 计算两个不同的耗时
         if data["system"]["save_time"]:
             try:
-                from datetime import datetime
-
-                def _parse_time(value: str):
-                    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M"):
-                        try:
-                            return datetime.strptime(value, fmt)
-                        except ValueError:
-                            continue
-                    return None
-
                 save_time = _parse_time(data["system"]["save_time"])
                 if save_time:
                     # 计算本次任务耗时（秒）：结束时间 - 本次任务开始时间
@@ -410,7 +534,7 @@ class buding_BatchStatisticsLog:
         if header_text.strip():
             lines.append(header_text.strip())
             
-        lines.append("=" * 50)
+        lines.append(self._EQ50)
         
         # 1. 产出统计 (Output)
         out_lines = []
@@ -454,20 +578,20 @@ class buding_BatchStatisticsLog:
             lines.append(f"    ✅ TXT文件总数: {inp.get('file_count', '0')}")
             lines.append(f"    📂 根目录: {inp.get('root_dir', '未知')}")
             lines.append(f"    📉 数据量: 扫描 {inp.get('scanned_lines', '0')} 行 -> 筛选输出 {inp.get('output_lines', '0')} 行")
-            lines.append("-" * 40)
+            lines.append(self._DASH40)
             if inp.get("file_list"):
                 file_list = inp["file_list"].split("\n")
                 for f in file_list:
                     if f.strip():
-                        clean_f = re.sub(r"^\s*\d+\.\s*", "", f)
+                        clean_f = _RE_LIST_NUM.sub("", f)
                         lines.append(f"     > {clean_f}")
-                lines.append("-" * 40)
+                lines.append(self._DASH40)
             lines.append(f"📍 结束位置: {inp.get('end_pos', '未知')}")
             lines.append(f"📌 结束行号: 第 {inp.get('end_line', '0')} 行 (文件内行号)")
             lines.append("")
 
         if footer_text.strip():
-            lines.append("=" * 50)
+            lines.append(self._EQ50)
             lines.append(footer_text.strip())
             lines.append("")
 
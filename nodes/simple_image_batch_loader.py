@@ -457,7 +457,7 @@ class buding_SimpleImageBatchLoader:
                 
                 # 转换为tensor
                 img_array = np.array(img).astype(np.float32) / 255.0
-                img_tensor = torch.from_numpy(img_array)[None,]
+                img_tensor = torch.from_numpy(img_array).unsqueeze(0)
                 
                 images.append(img_tensor)
                 file_paths.append(image_path)